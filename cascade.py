@@ -0,0 +1,178 @@
+import hashlib
+import threading
+import collections
+
+# 1- Cascade (class)
+
+# -----------------------------------------------------------
+# Class:        Cascade
+# Description:  Decryption of a cascade cipher (layers applied one after
+#               the other), remembering the output of every layer
+#               layers: list of decrypt(text, key) functions in the order
+#                   they are applied to the ciphertext, or of
+#                   (decrypt, canonical) or (decrypt, canonical, kind) tuples
+#                   canonical(key) gives a value that is the same for keys
+#                   that decrypt the same way (e.g. the key order of a
+#                   transposition key), None if there is none
+#                   kind: 'substitution' (each symbol is replaced on its
+#                   own, e.g. shift), 'transposition' (symbols only move,
+#                   so their frequencies do not change) or None
+#               A substitution commutes with transpositions, so when all the
+#               other layers are transpositions its key can be found on the
+#               ciphertext alone, before searching them (see rank_keys)
+#               cacheSize: layer outputs kept, the least recently used
+#                   ones are dropped first
+#               splitKey(key), if given, gives the keys of the layers from
+#                   the key of the whole cascade, so decrypt can be used as
+#                   the decrypt(ciphertext, key) of a keysearch.KeySearch
+#               Outputs are cached by (layer, key, hash of the input), so a
+#               search never decrypts the same layer input with the same key
+#               twice while it stays in the cache
+#               The cache can be used by several threads; create a Cascade
+#               per search, so its outputs are freed when the search ends
+#               Decrypt functions must be module level functions when the
+#               Cascade is used by a keysearch.KeySearch with workers: each
+#               worker process gets a copy with an empty cache, and its
+#               hits and misses are added back (see get_counts)
+# -----------------------------------------------------------
+
+
+class Cascade:
+
+    def __init__(self, layers, cacheSize=4096, splitKey=None):
+        self.layers = []
+        for layer in layers:
+            layer = layer if isinstance(layer, tuple) else (layer,)
+            self.layers.append(layer + (None,) * (3 - len(layer)))
+        self.cacheSize = cacheSize
+        self.splitKey = splitKey
+        self._lock = threading.Lock()
+        self.clear()
+
+    # copies (e.g. for worker processes) start with an empty cache
+    def __getstate__(self):
+        return {'layers': self.layers, 'cacheSize': self.cacheSize, 'splitKey': self.splitKey}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self.clear()
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    #               keys (sequence): one key per layer, or the key of the
+    #                   cascade if splitKey is given
+    # Return:       plaintext (str)
+    # -----------------------------------------------------------
+    def decrypt(self, ciphertext, keys):
+        if self.splitKey is not None:
+            keys = self.splitKey(keys)
+        text = ciphertext
+        for i in range(len(self.layers)):
+            decrypt, canonical, kind = self.layers[i]
+            key = keys[i] if canonical is None else canonical(keys[i])
+            try:
+                cacheKey = (i, key, self._get_hash(i, text))
+            except TypeError:
+                # unhashable key (e.g. a list)
+                cacheKey = (i, repr(key), self._get_hash(i, text))
+            with self._lock:
+                output = self._cache.get(cacheKey)
+                if output is not None:
+                    self.hits += 1
+                    self._cache.move_to_end(cacheKey)
+            if output is None:
+                output = decrypt(text, keys[i])
+                with self._lock:
+                    self.misses += 1
+                    self._cache[cacheKey] = output
+                    if len(self._cache) > self.cacheSize:
+                        self._cache.popitem(last=False)
+            text = output
+        return text
+
+    # -----------------------------------------------------------
+    # Parameters:   i (int): layer
+    #               ciphertext (str)
+    #               keys (list): keys of layer i
+    #               score: function of a text, lower is more likely
+    #                   (e.g. utilities.get_chiSquared)
+    # Return:       keys (list): the same keys, most likely first
+    # Description:  If layer i is a substitution and all the other layers
+    #               are transpositions, the symbols of the plaintext are the
+    #               symbols of the ciphertext decrypted by layer i alone, in
+    #               another order: keys are sorted by the score of that
+    #               decryption (equal scores keep their order)
+    #               Otherwise layer i can not be solved alone, and keys are
+    #               returned in their order
+    # -----------------------------------------------------------
+    def rank_keys(self, i, ciphertext, keys, score):
+        keys = list(keys)
+        if self.layers[i][2] != 'substitution':
+            return keys
+        for j in range(len(self.layers)):
+            if j != i and self.layers[j][2] != 'transposition':
+                return keys
+        scores = [score(self.layers[i][0](ciphertext, key)) for key in keys]
+        return [keys[k] for k in sorted(range(len(keys)), key=lambda k: scores[k])]
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       stats (dict): hits, misses, entries (outputs in the
+    #               cache) and hitRatio of the layer decryptions
+    #               (of this process)
+    # -----------------------------------------------------------
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._cache),
+                'hitRatio': self.hits / total if total > 0 else 0}
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       counts (list): [hits, misses]
+    # Description:  Counts protocol of keysearch.KeySearch: the counts of
+    #               the copies in worker processes are added to this one
+    # -----------------------------------------------------------
+    def get_counts(self):
+        return [self.hits, self.misses]
+
+    # -----------------------------------------------------------
+    # Parameters:   counts (list): [hits, misses] to add
+    # Return:       None
+    # -----------------------------------------------------------
+    def add_counts(self, counts):
+        with self._lock:
+            self.hits += counts[0]
+            self.misses += counts[1]
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       None
+    # Description:  Empties the cache and resets the statistics
+    # -----------------------------------------------------------
+    def clear(self):
+        with self._lock:
+            self._cache = collections.OrderedDict()
+            self._inputs = [(None, None)] * len(self.layers)
+            self.hits = 0
+            self.misses = 0
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   i (int): layer
+    #               text (str): its input
+    # Return:       hash of text (str)
+    # Description:  Consecutive keys usually give a layer the same input
+    #               object (the ciphertext, or a cached output), which is
+    #               only hashed once
+    #               The (input, hash) pair is read and replaced as a whole,
+    #               so another thread can not pair a text with another hash
+    # -----------------------------------------------------------
+    def _get_hash(self, i, text):
+        inputs = self._inputs
+        last = inputs[i]
+        if last[0] is not text:
+            last = (text, hashlib.sha1(text.encode('utf8')).hexdigest())
+            inputs[i] = last
+        return last[1]
@@ -1,9 +1,14 @@
 # author Brayan Boukhman
 import math
 import string
+import functools
 import mod
 import matrix
 import utilities
+import dictionary
+import keysearch
+import cascade
+import resultcache
 
 
 # -----------------------------------------------------------
@@ -140,19 +145,13 @@ def d_scytale(ciphertext, key):
 # Return:       list of words (list)
 # Description:  Reads a given dictionary file
 #               dictionary file is assumed to be formatted: each word in a separate line
-#               Returns a list of strings, each pertaining to a dictionary word
+#               Returns the shared set-like Dictionary (see dictionary.py)
+#               The file is only read once per process
 # -----------------------------------------------------------
 
 
 def load_dictionary(dictFile):
-    dictList = []
-    # your code here
-    fv = open(dictFile, "r", encoding="mbcs")
-    line = fv.readline()
-    while line != "":
-        dictList.append(line.strip('\n'))
-        line = fv.readline()
-    return dictList
+    return dictionary.load_dictionary(dictFile)
 
 # -------------------------------------------------------------------
 # Parameters:   text (string)
@@ -178,7 +177,7 @@ def text_to_words(text):
 
 # -----------------------------------------------------------
 # Parameters:   text (string)
-#               dictFile (string): dictionary file
+#               dictFile (string): dictionary file, or a loaded Dictionary
 # Return:       (#matches, #mismatches)
 # Description:  Reads a given text, checks if each word appears in dictionary
 #               Returns a tuple of number of matches and number of mismatches.
@@ -190,7 +189,7 @@ def analyze_text(text, dictFile):
     matches = 0
     mismatches = 0
     # your code here
-    dictList = load_dictionary(dictFile)
+    dictList = dictionary.as_dictionary(dictFile)
     wordList = text_to_words(text)
     for word in wordList:
         if word.lower() in dictList:
@@ -201,12 +200,14 @@ def analyze_text(text, dictFile):
 
 # -----------------------------------------------------------
 # Parameters:   text (string)
-#               dictFile (string): dictionary file
+#               dictFile (string): dictionary file, or a loaded Dictionary
+#                   or a scorer function: text --> ratio between 0 to 1
 #               threshold (float): number between 0 to 1
 # Return:       True/False
 # Description:  Check if a given file is a plaintext
 #               If #matches/#words >= threshold --> True
 #                   otherwise --> False
+#               If a scorer is given: scorer(text) >= threshold --> True
 #               If invalid threshold given, default is 0.9
 #               An empty string is assumed to be non-plaintext.
 # -----------------------------------------------------------
@@ -219,23 +220,46 @@ def is_plaintext(text, dictFile, threshold):
 
     if not (threshold >= 0 and threshold <= 1):
         threshold = 0.9
-    (matches, mismatches) = analyze_text(text, dictFile)
+    if callable(dictFile):
+        return dictFile(text) >= threshold
+    wordList = text_to_words(text)
+    return utilities.is_plaintext_stream(wordList, len(wordList), dictFile, threshold)
 
-    total_words = matches + mismatches
-    if (matches / total_words) >= threshold:
-        return True
-    return False
+# -----------------------------------------------------------
+# Parameters:   text (string)
+# Return:       text (string)
+# Description:  Words of a text (see text_to_words) joined by single spaces
+#               Used as the transform of a keysearch.KeySearch, so its
+#               scoring counts the same words as is_plaintext
+# -----------------------------------------------------------
+
+
+def join_words(text):
+    return ' '.join(text_to_words(text))
 
 # ---------------------------------
 #       Problem 3                #
 # ---------------------------------
 
+# ----------------------------------------------------
+# Parameters:   values (tuple): (key,)
+# Return:       key (int)
+# Description:  Key of cryptanalysis_scytale (see keysearch.KeySpace)
+# ---------------------------------------------------
+
+
+def buildKey_scytale(values):
+    return values[0]
+
 # ----------------------------------------------------
 # Parameters:   cipherFile (string)
 #               dictFile (string)
 #               startKey (int)
 #               endKey (int)
 #               threshold (float)
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
 # Return:       key (string)
 # Description:  Apply brute-force to break scytale cipher
 #               Valid key range: 2-100 (if invalid --> print error msg and return '')
@@ -245,7 +269,8 @@ def is_plaintext(text, dictFile, threshold):
 # ---------------------------------------------------
 
 
-def cryptanalysis_scytale(cipherFile, dictFile, startKey, endKey, threshold):
+@resultcache.cached('scytale')
+def cryptanalysis_scytale(cipherFile, dictFile, startKey, endKey, threshold, **options):
     # your code here
     if not (startKey >= 2 and endKey <= 100):
         print("Invalid key range. Operation aborted!")
@@ -257,15 +282,17 @@ def cryptanalysis_scytale(cipherFile, dictFile, startKey, endKey, threshold):
         print("Returned Key = ")
         return
 
-    for i in range(startKey, endKey):
-        plaintext = d_scytale(cipherFile, i)
-        if is_plaintext(plaintext, dictFile, threshold):
-            print("Key found:", i)
-            print(plaintext)
-            print("Returned Key", i)
-            return i
-        else:
-            print("key {%d} failed", i)
+    space = keysearch.KeySpace([(range(startKey, endKey),)], buildKey_scytale)
+    transform = join_words if not callable(dictFile) else None
+    result = keysearch.KeySearch(space, d_scytale, dictFile, threshold, transform=transform,
+                                 **options).run(cipherFile)
+    for i in range(startKey, startKey + result.attempts - (result.status == 'found')):
+        print("key {%d} failed", i)
+    if result.status == 'found':
+        print("Key found:", result[1])
+        print(result[0])
+        print("Returned Key", result[1])
+        return result[1]
     return
 
 # ---------------------------------
@@ -737,10 +764,25 @@ def d_blockRotate(ciphertext, key):
 
     return plaintext
 
+# -----------------------------------------------------------
+# Parameters:   values (tuple): (b, r)
+# Return:       key (tuple)
+# Description:  Key of cryptanalysis_blockRotate (see keysearch.KeySpace)
+# -----------------------------------------------------------
+
+
+def buildKey_blockRotate(values):
+    return values
+
 # -----------------------------------------------------------
 # Parameters:   ciphertext (string)
 #               b1 (int): starting block size
 #               b2 (int): end block size
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
 # Return:       plaintext,key
 # Description:  Cryptanalysis of Block Rotate Cipher
 #               Returns plaintext and key (r,b)
@@ -749,28 +791,20 @@ def d_blockRotate(ciphertext, key):
 # -----------------------------------------------------------
 
 
-def cryptanalysis_blockRotate(ciphertext, b1, b2):
-    plaintext = ''
-    key = (0, 0)
-    i = 0
-    for b in range(b1, b2 + 1):
-        for r in range(1, b):
-            temp = d_blockRotate(ciphertext, (b, r))
-            i += 1
-            if utilities.is_plaintext(temp, "engmix.txt", 0.7):
-                key = (b, r)
-                plaintext = temp
-                break
-        if plaintext != '':
-            break
+@resultcache.cached('blockRotate')
+def cryptanalysis_blockRotate(ciphertext, b1, b2, scorer="engmix.txt", **options):
+    space = keysearch.KeySpace([([b], range(1, b)) for b in range(b1, b2 + 1)], buildKey_blockRotate)
+    result = keysearch.KeySearch(space, d_blockRotate, scorer, 0.7, **options).run(ciphertext)
 
-    if plaintext != '':
-        print("Key found after", i, "attempts")
-        print("Key =", key)
-        print(plaintext)
-    else:
+    if result.status == 'found':
+        print("Key found after", result.attempts, "attempts")
+        print("Key =", result[1])
+        print(result[0])
+    elif result.status == 'not found':
         print("Block Rotate Cryptanalysis Failed. No Key was found")
-    return plaintext, key
+        result = keysearch.SearchResult(('', (0, 0)), result.status, result.attempts, result.fraction,
+                                        result.ranked)
+    return result
 
 
 # -----------------------------------------------------------
@@ -1016,6 +1050,18 @@ def get_keyOrder_columnarTrans(key):
         keyOrder.append(count)
     return keyOrder
 
+# -----------------------------------------------------------
+# Parameters:   key (str)
+# Return:       canonical key (tuple): the key order of key as a tuple
+#               (or the error message of get_keyOrder_columnarTrans)
+# Description:  Keys with the same canonical key encrypt the same way
+# -----------------------------------------------------------
+
+
+def get_canonicalKey_columnarTrans(key):
+    keyOrder = get_keyOrder_columnarTrans(key)
+    return tuple(keyOrder) if isinstance(keyOrder, list) else keyOrder
+
 # -----------------------------------------------------------
 # Parameters:   plaintext (str)
 #               kye (str)
@@ -1525,30 +1571,90 @@ def d_myszkowski(ciphertext, key):
     return plaintext
 
 
-def cryptanalysis1_myszkowski(ciphertext):
-    plaintext = ''
-    dictFile = utilities.load_dictionary('engmix.txt')
-    keys = [['a', 'b', 'a'], ['b', 'b', 'a'], ['a', 'b', 'b'],
-            ['b', 'a', 'b'], ['a', 'a', 'b'], ['b', 'a', 'a']]
-    count = 0
+# -----------------------------------------------------------
+# Parameters:   values (tuple): (key,)
+# Return:       key (str)
+# Description:  Key of the Myszkowski cryptanalysis (see keysearch.KeySpace)
+# -----------------------------------------------------------
 
-    for key in keys:
-        count += 1
-        result_key = key[0] + key[1] + key[2]
-        plaintext = d_myszkowski(ciphertext, result_key)
-        if utilities.is_plaintext(plaintext, dictFile, 0.9):
-            print("key found after", count, "attempts")
-            break
 
-    key = ''.join(key)
-    return plaintext, key
+def buildKey_myszkowski(values):
+    return values[0]
+
+# -----------------------------------------------------------
+# Parameters:   key (str)
+# Return:       canonical key (tuple): the key order of key as a tuple
+# Description:  Keys with the same canonical key encrypt the same way
+# -----------------------------------------------------------
+
 
+def get_canonicalKey_myszkowski(key):
+    return tuple(get_keyOrder_myszkowski(key))
 
-def cryptanalysis2_myszkowski(ciphertext, length):
-    plaintext = ''
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               keys (list): keys to try, in order
+#               dictFile: dictionary or scorer function
+#               options (dict): passed to keysearch.KeySearch
+# Return:       result (keysearch.SearchResult)
+# Description:  Common search of the Myszkowski cryptanalysis functions
+#               If no key works, returns the decryption with the last key
+#               Keys with the same key order are decrypted once; the keys
+#               that match the one found are in result.equivalent
+# -----------------------------------------------------------
+
+
+def search_myszkowski(ciphertext, keys, dictFile, options):
+    space = keysearch.KeySpace([(keys,)], buildKey_myszkowski)
+    result = keysearch.KeySearch(space, d_myszkowski, dictFile, 0.9,
+                                 canonical=get_canonicalKey_myszkowski, **options).run(ciphertext)
+    if result.status == 'found':
+        print("key found after", result.attempts, "attempts")
+    elif result.status == 'not found' and keys != []:
+        result = keysearch.SearchResult((d_myszkowski(ciphertext, keys[-1]), keys[-1]), result.status,
+                                        result.attempts, result.fraction, result.ranked,
+                                        result.equivalent)
+    return result
+
+
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
+# Return:       plaintext, key
+# Description:  Cryptanalysis of Myszkowski with the 3 letter keys of 2 letters
+# -----------------------------------------------------------
+
+
+@resultcache.cached('myszkowski1')
+def cryptanalysis1_myszkowski(ciphertext, scorer=None, **options):
+    dictFile = scorer if scorer is not None else utilities.load_dictionary('engmix.txt')
+    keys = ['aba', 'bba', 'abb', 'bab', 'aab', 'baa']
+    return search_myszkowski(ciphertext, keys, dictFile, options)
+
+
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               length (int): key length
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
+# Return:       plaintext, key
+# Description:  Cryptanalysis of Myszkowski with the engmix.txt words of
+#               the given length as keys
+# -----------------------------------------------------------
+
+
+@resultcache.cached('myszkowski2')
+def cryptanalysis2_myszkowski(ciphertext, length, scorer=None, **options):
     keys = []
     error_case = [1, 1, 0]
-    dictFile = utilities.load_dictionary('engmix.txt')
+    dictFile = scorer if scorer is not None else utilities.load_dictionary('engmix.txt')
     fv = open('engmix.txt', 'r', encoding='utf8', errors='ignore')
     line = fv.readline()
 
@@ -1558,23 +1664,28 @@ def cryptanalysis2_myszkowski(ciphertext, length):
                 keys.append(word)
         line = fv.readline()
 
-    count = 0
-    for word in keys:
-        count += 1
-        plaintext = d_myszkowski(ciphertext, word)
-        if utilities.is_plaintext(plaintext, dictFile, 0.9):
-            print("key found after", count, "attempts")
-            break
-    key = word
     fv.close()
-    return plaintext, key
+    return search_myszkowski(ciphertext, keys, dictFile, options)
 
 
-def cryptanalysis3_myszkowski(ciphertext):
-    plaintext = ''
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
+# Return:       plaintext, key
+# Description:  Cryptanalysis of Myszkowski with the 5 letter engmix.txt
+#               words of 3 distinct letters, one of them used 3 times
+# -----------------------------------------------------------
+
+
+@resultcache.cached('myszkowski3')
+def cryptanalysis3_myszkowski(ciphertext, scorer=None, **options):
     keys = []
     error_case = [1, 1, 0]
-    dictFile = utilities.load_dictionary('engmix.txt')
+    dictFile = scorer if scorer is not None else utilities.load_dictionary('engmix.txt')
     fv = open('engmix.txt', 'r', encoding='utf8', errors='ignore')
     line = fv.readline()
 
@@ -1587,16 +1698,8 @@ def cryptanalysis3_myszkowski(ciphertext):
                         keys.append(word)
         line = fv.readline()
 
-    count = 0
-    for word in keys:
-        count += 1
-        plaintext = d_myszkowski(ciphertext, word)
-        if utilities.is_plaintext(plaintext, dictFile, 0.9):
-            print("key found after", count, "attempts")
-            break
-    key = word
     fv.close()
-    return plaintext, key
+    return search_myszkowski(ciphertext, keys, dictFile, options)
 
 # -----------------------------------------------------------
 # Parameters:   plaintext (str)
@@ -1689,33 +1792,71 @@ def d_decimation(ciphertext, key):
 
     return plaintext
 
+# -----------------------------------------------------------
+# Parameters:   values (tuple): (subString, k)
+# Return:       key (tuple)
+# Description:  Key of cryptanalysis_decimation (see keysearch.KeySpace)
+# -----------------------------------------------------------
+
+
+def buildKey_decimation(values):
+    return values
+
 # -----------------------------------------------------------
 # Parameters:   ciphertext (str)
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#               bestFirst (bool): False --> keys are tried in order
+#                   True --> keys are tried best-first (see order_affineKeys)
+#               solve (bool): True --> the keys solved from symbol
+#                   frequencies (see solve_affineKeys) are tried before
+#                   the others (not with topK)
+#               lengths: base string lengths to try (see get_baseLengths),
+#                   None --> 26 to 69 in order, 'infer' --> the likely ones
+#                   (see infer_baseLengths)
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
 # Return:       plaintext,key
 # Description:  Cryptanalysis of Decimation Cipher
+#               Base strings of length 26 to 69 are tried in order
+#               Decryptions are scored in lower case
 # -----------------------------------------------------------
 
 
-def cryptanalysis_decimation(ciphertext):
+@resultcache.cached('decimation')
+def cryptanalysis_decimation(ciphertext, scorer=None, bestFirst=False, solve=False, lengths=None,
+                             **options):
     # your code here
     baseString = utilities.get_baseString()
-    dictList = utilities.load_dictionary('engmix.txt')
-
-    tries = 0
-    x = 26
-    while x < len(baseString):
-        subString = baseString[:x]
-        for i in range(len(subString)):
-            if mod.is_relatively_prime(i, len(subString)):
-                plaintext = d_decimation(ciphertext, (subString, i))
-                if plaintext is None:
-                    continue
-                tries += 1
-                if utilities.is_plaintext(plaintext.lower(), dictList, 0.95):
-                    print('Key found after {} attempts'.format(tries))
-                    return plaintext, (subString, i)
-        x += 1
-    return '', ''
+    if scorer is None:
+        scorer = utilities.load_dictionary('engmix.txt')
+
+    solved = 0
+    if solve and options.get('topK', 0) == 0:
+        space = keysearch.list_space(solve_affineKeys(ciphertext, True))
+        result = keysearch.KeySearch(space, d_decimation, scorer, 0.95, transform=str.lower,
+                                     **dict(options, checkpoint='')).run(ciphertext)
+        if result.status != 'not found':
+            if result.status == 'found':
+                print('Key found after {} attempts'.format(result.attempts))
+            return result
+        solved = result.attempts
+
+    segments = []
+    for x in get_baseLengths(ciphertext, lengths):
+        keys = [i for i in range(x) if mod.is_relatively_prime(i, x)]
+        segments.append(([baseString[:x]], keys))
+    space = keysearch.KeySpace(segments, buildKey_decimation)
+    if bestFirst:
+        keys = [key for n, key in space.keys(0, len(space))]
+        space = keysearch.list_space(order_affineKeys(ciphertext, keys, [(key[1], 0) for key in keys]))
+    result = keysearch.KeySearch(space, d_decimation, scorer, 0.95, transform=str.lower,
+                                 **options).run(ciphertext)
+    result.attempts += solved
+    if result.status == 'found':
+        print('Key found after {} attempts'.format(result.attempts))
+    return result
 
 # -----------------------------------------------------------
 # Parameters:   plaintext (str)
@@ -1797,36 +1938,236 @@ def d_affine(ciphertext, key):
             plaintext += char
     return plaintext
 
+# -----------------------------------------------------------
+# Parameters:   values (tuple): (subString, alpha, beta)
+# Return:       key (tuple)
+# Description:  Key of cryptanalysis_affine (see keysearch.KeySpace)
+# -----------------------------------------------------------
+
+
+def buildKey_affine(values):
+    return (values[0], [values[1], values[2]])
+
 # -----------------------------------------------------------
 # Parameters:   ciphertext (str)
+#               keys (list): keys whose first item is the base string
+#               params (list): (alpha, beta) of every key
+#                   decimation with key k is alpha = k, beta = 0
+# Return:       keys (list): the same keys, most likely first
+# Description:  Best-first order of affine and decimation keys
+#               A key decrypts the symbol at position alpha*x+beta of the
+#               base string to the symbol at position x, so the histogram
+#               of its plaintext is a permutation of the ciphertext
+#               histogram, found without decrypting
+#               Keys are sorted by chi-squared of that histogram against
+#               English: letters (utilities.get_freqTable) 80%, space 17%,
+#               other symbols 3%, divided by the number of symbols
+#               Equal scores keep the order of keys
+# -----------------------------------------------------------
+
+
+def order_affineKeys(ciphertext, keys, params):
+    baseString = utilities.get_baseString()
+    text = ciphertext.lower()
+    histogram = [text.count(char) for char in baseString]
+    freqTable = utilities.get_freqTable()
+
+    expected = {}
+    scores = []
+    for i in range(len(keys)):
+        n = len(keys[i][0])
+        alpha, beta = params[i]
+        if n not in expected:
+            weights = [0.8 * f for f in freqTable] + [0.17 if n > 26 else 0, 0.03 if n > 27 else 0]
+            total = sum(histogram[:n])
+            expected[n] = (total, [w / sum(weights) * total for w in weights])
+        total, E = expected[n]
+        if total == 0:
+            scores.append(0)
+            continue
+        chi = 0
+        other = total
+        for x in range(min(n, 27)):
+            observed = histogram[(alpha * x + beta) % n]
+            other -= observed
+            chi += (observed - E[x]) ** 2 / E[x]
+        if n > 27:
+            chi += (other - E[27]) ** 2 / E[27]
+        scores.append(chi / total)
+    order = sorted(range(len(keys)), key=lambda i: scores[i])
+    return [keys[i] for i in order]
+
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               decimation (bool): True --> decimation keys (baseString, k)
+#                   False --> affine keys (baseString, [alpha, beta])
+#               maxKeys (int): number of keys returned
+# Return:       keys (list): most likely keys first
+# Description:  Solves the keys from symbol frequencies, for every base
+#               string of length n from 26 to 69:
+#               the most frequent ciphertext symbols (positions y1, y2)
+#               are taken as encryptions of frequent English symbols
+#               (positions x1, x2: space, then letters by frequency), so
+#               affine: alpha*(x1 - x2) = y1 - y2 mod n and
+#                   beta = y1 - alpha*x1 mod n
+#               decimation: k*x1 = y1 mod n
+#               The invertible solutions of these linear congruences are
+#               ranked by order_affineKeys, and the best maxKeys are kept
+# -----------------------------------------------------------
+
+
+def solve_affineKeys(ciphertext, decimation=False, maxKeys=16):
+    baseString = utilities.get_baseString()
+    text = ciphertext.lower()
+    freqTable = utilities.get_freqTable()
+    letters = sorted(range(26), key=lambda i: -freqTable[i])[:9]
+
+    keys = []
+    params = []
+    for n in range(26, len(baseString)):
+        counts = [(text.count(baseString[y]), y) for y in range(n)]
+        cipherSymbols = [y for count, y in sorted(counts, reverse=True)[:2] if count > 0]
+        plainSymbols = ([26] if n > 26 else []) + letters
+        solved = set()
+        for x1 in plainSymbols:
+            if decimation and cipherSymbols != []:
+                solved.update((k, 0) for k in mod.linear_congruence(x1, cipherSymbols[0], n))
+                continue
+            for x2 in plainSymbols:
+                if x2 != x1 and len(cipherSymbols) == 2:
+                    y1, y2 = cipherSymbols
+                    solved.update((alpha, (y1 - alpha * x1) % n)
+                                  for alpha in mod.linear_congruence(x1 - x2, y1 - y2, n))
+        for alpha, beta in sorted(solved):
+            if math.gcd(alpha, n) == 1:
+                keys.append((baseString[:n], alpha) if decimation else (baseString[:n], [alpha, beta]))
+                params.append((alpha, beta))
+    return order_affineKeys(ciphertext, keys, params)[:maxKeys]
+
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+# Return:       lengths (list): base string lengths (26 to 69) the
+#               ciphertext may have been encrypted with, most likely first
+# Description:  A cipher with base string baseString[:n] encrypts the
+#               symbols of its prefix (upper case letters as letters) and
+#               leaves the others, so a ciphertext symbol after the prefix
+#               is a plaintext symbol
+#               The plaintext is taken to be English: letters, space,
+#               digits, common punctuation and new lines
+#               1- a ciphertext symbol that is not one of these must be
+#                  encrypted: lengths up to its position are ruled out
+#               2- the other lengths are sorted by log-likelihood:
+#                  the k symbols used in the prefix are anywhere in it
+#                  (-log C(n, k), so longer prefixes must explain gaps)
+#                  and the counts of the symbols after it are Poisson with
+#                  English frequencies (see order_affineKeys), so shorter
+#                  prefixes must explain frequent symbols left as they are
+#               Equal scores are sorted shorter first
+# -----------------------------------------------------------
+
+
+def infer_baseLengths(ciphertext):
+    baseString = utilities.get_baseString()
+    plainSymbols = ' 0123456789.,\'"!?-;:()\n'
+    text = ciphertext.lower()
+    counts = [text.count(char) for char in baseString]
+
+    weights = [0.8 * f for f in utilities.get_freqTable()]
+    for char in baseString[26:]:
+        if char == ' ':
+            weights.append(0.17)
+        elif char in '.,':
+            weights.append(0.01)
+        elif char in plainSymbols:
+            weights.append(0.001)
+        else:
+            weights.append(0)
+    expected = [max(w / sum(weights) * sum(counts), 0.01) for w in weights]
+
+    shortest = 26
+    for i in range(26, len(baseString)):
+        if counts[i] > 0 and baseString[i] not in plainSymbols:
+            shortest = max(shortest, i + 1)
+    scores = {}
+    for n in range(shortest, len(baseString)):
+        k = len([count for count in counts[:n] if count > 0])
+        score = math.lgamma(k + 1) + math.lgamma(n - k + 1) - math.lgamma(n + 1)
+        for i in range(n, len(baseString)):
+            score += counts[i] * math.log(expected[i]) - expected[i] - math.lgamma(counts[i] + 1)
+        scores[n] = score
+    return sorted(scores, key=lambda n: (-scores[n], n))
+
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               lengths: None --> 26 to 69 in order
+#                   'infer' --> infer_baseLengths(ciphertext)
+#                   list --> these lengths, in this order
+# Return:       lengths (list): base string lengths to search
+# -----------------------------------------------------------
+
+
+def get_baseLengths(ciphertext, lengths):
+    if lengths is None:
+        return list(range(26, len(utilities.get_baseString())))
+    if lengths == 'infer':
+        return infer_baseLengths(ciphertext)
+    return list(lengths)
+
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#               bestFirst (bool): False --> keys are tried in order
+#                   True --> keys are tried best-first (see order_affineKeys)
+#               solve (bool): True --> the keys solved from symbol
+#                   frequencies (see solve_affineKeys) are tried before
+#                   the others (not with topK)
+#               lengths: base string lengths to try (see get_baseLengths),
+#                   None --> 26 to 69 in order, 'infer' --> the likely ones
+#                   (see infer_baseLengths)
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
 # Return:       plaintext,key
 # Description:  Cryptanalysis of Affine Cipher
+#               Base strings of length 26 to 69 are tried in order
+#               Decryptions are scored in lower case
 # -----------------------------------------------------------
 
 
-def cryptanalysis_affine(ciphertext):
+@resultcache.cached('affine')
+def cryptanalysis_affine(ciphertext, scorer=None, bestFirst=False, solve=False, lengths=None,
+                         **options):
     # your code here
-    plaintext = ''
     baseString = utilities.get_baseString()
-    dictList = utilities.load_dictionary('engmix.txt')
-    tries = 0
-    x = 26
-
-    while x < len(baseString):
-        subString = baseString[:x]
-        for i in range(len(subString)):
-            for j in range(len(subString)):
-                key = (subString, [i, j])
-                if mod.is_relatively_prime(i, len(subString)):
-                    plaintext = d_affine(ciphertext, key)
-                    if plaintext is None:
-                        continue
-                    tries += 1
-                    if utilities.is_plaintext(plaintext.lower(), dictList, 0.9):
-                        print('key found after {} attempts'.format(tries))
-                        return plaintext, key
-        x += 1
-    return '', ''
+    if scorer is None:
+        scorer = utilities.load_dictionary('engmix.txt')
+
+    solved = 0
+    if solve and options.get('topK', 0) == 0:
+        space = keysearch.list_space(solve_affineKeys(ciphertext))
+        result = keysearch.KeySearch(space, d_affine, scorer, 0.9, transform=str.lower,
+                                     **dict(options, checkpoint='')).run(ciphertext)
+        if result.status != 'not found':
+            if result.status == 'found':
+                print('key found after {} attempts'.format(result.attempts))
+            return result
+        solved = result.attempts
+
+    segments = []
+    for x in get_baseLengths(ciphertext, lengths):
+        alphas = [i for i in range(x) if mod.is_relatively_prime(i, x)]
+        segments.append(([baseString[:x]], alphas, range(x)))
+    space = keysearch.KeySpace(segments, buildKey_affine)
+    if bestFirst:
+        keys = [key for n, key in space.keys(0, len(space))]
+        space = keysearch.list_space(order_affineKeys(ciphertext, keys, [key[1] for key in keys]))
+    result = keysearch.KeySearch(space, d_affine, scorer, 0.9, transform=str.lower,
+                                 **options).run(ciphertext)
+    result.attempts += solved
+    if result.status == 'found':
+        print('key found after {} attempts'.format(result.attempts))
+    return result
 
 # -----------------------------------------------------------
 # Parameters:   plaintext (str)
@@ -3016,69 +3357,177 @@ def e_shift(plaintext, key):
 
 # -----------------------------------------------------------
 # Parameters:   ciphertext (str)
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#                       use segmentation.get_ratio if the plaintext has no spaces
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
 # Return:       plaintext (str)
 #               key (str)
 # Description:  Cryptanalysis of Polybius & Columnar Transposition
+#               All 2 letter keys are tried in order, once per key order
+#               (the keys that match the one found are in result.equivalent)
 # -----------------------------------------------------------
 
 
-def cryptanalysis_q4A(ciphertext):
+@resultcache.cached('q4A')
+def cryptanalysis_q4A(ciphertext, scorer=None, **options):
     ciphertext = d_polybius(ciphertext, None)
     alphabet = utilities.get_lower()
-    dictList = utilities.load_dictionary('engmix.txt')
+    if scorer is None:
+        scorer = utilities.load_dictionary('engmix.txt')
+
+    space = keysearch.KeySpace([(alphabet, alphabet)], buildKey_q4A)
+    result = keysearch.KeySearch(space, d_columnarTrans, scorer, 0.9,
+                                 canonical=get_canonicalKey_columnarTrans, **options).run(ciphertext)
+    if result[1] == '':
+        result = keysearch.SearchResult(('', 'not found'), result.status, result.attempts,
+                                        result.fraction, result.ranked, result.equivalent)
+    return result
 
-    for i in range(len(alphabet)):
-        for j in range(len(alphabet)):
-            key = alphabet[i] + alphabet[j]
-            plaintext = d_columnarTrans(ciphertext, key)
-            if utilities.is_plaintext(plaintext, dictList, 0.9):
-                return plaintext, key
+# -----------------------------------------------------------
+# Parameters:   values (tuple): (first letter, second letter)
+# Return:       key (str)
+# Description:  Key of cryptanalysis_q4A (see keysearch.KeySpace)
+# -----------------------------------------------------------
 
-    return '', 'not found'
+
+def buildKey_q4A(values):
+    return values[0] + values[1]
 
 # -----------------------------------------------------------
 # Parameters:   ciphertext (str)
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#                       use segmentation.get_ratio if the plaintext has no spaces
+#               solve (bool): True --> shifts are tried from the most likely
+#                   (see cascade.Cascade.rank_keys), default is False
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
 # Return:       plaintext (str)
 #               key (str)
 #               (x, 'r') (tuple)
+#               result.stats: cache hits of the decryptions
+#                   (see get_cascade_q4B and cascade.Cascade.get_stats)
 # Description:  Cryptanalysis of Shift & Columnar Transposition
+#               Shifts 0 to 25 are tried in order, each with all 2 letter keys
+#               once per key order (the keys that match the one found are
+#               in result.equivalent)
+#               The transposition does not change letter frequencies, so
+#               with solve the shift is found from the chi-squared of the
+#               ciphertext shifted back, and the right shift usually comes
+#               first: about 3 decryptions instead of up to 78
+#               All shifts are still tried, so the result is the same
 # -----------------------------------------------------------
 
 
-def cryptanalysis_q4B(ciphertext):
+@resultcache.cached('q4B')
+def cryptanalysis_q4B(ciphertext, scorer=None, solve=False, **options):
     alphabet = utilities.get_lower()
-    dictList = utilities.load_dictionary('engmix.txt')
+    if scorer is None:
+        scorer = utilities.load_dictionary('engmix.txt')
+
+    cascadeQ4B = get_cascade_q4B()
+    shifts = range(26)
+    if solve:
+        keys = cascadeQ4B.rank_keys(0, ciphertext, [(x, 'r') for x in shifts],
+                                    utilities.get_chiSquared)
+        shifts = [key[0] for key in keys]
+    space = keysearch.KeySpace([(shifts, alphabet, alphabet)], buildKey_q4B)
+    result = keysearch.KeySearch(space, cascadeQ4B.decrypt, scorer, 0.9,
+                                 canonical=get_canonicalKey_q4B, **options).run(ciphertext)
+    if result[1] != '':
+        values = (result[0], result[1][0], result[1][1])
+    else:
+        values = ('', 'not found', (0, 'r'))
+    return keysearch.SearchResult(values, result.status, result.attempts, result.fraction,
+                                  result.ranked, result.equivalent, cascadeQ4B.get_stats())
+
+# -----------------------------------------------------------
+# Parameters:   values (tuple): (x, first letter, second letter)
+# Return:       key (tuple): (columnar key, (x, 'r'))
+# Description:  Key of cryptanalysis_q4B (see keysearch.KeySpace)
+# -----------------------------------------------------------
+
 
-    for x in range(26):
-        shift_plaintext = d_shift(ciphertext, (x, 'r'))
-        for i in range(len(alphabet)):
-            for j in range(len(alphabet)):
-                key = alphabet[i] + alphabet[j]
-                plaintext = d_columnarTrans(shift_plaintext, key)
-                if utilities.is_plaintext(plaintext, dictList, 0.9):
-                    return plaintext, key, (x, 'r')
+def buildKey_q4B(values):
+    return (values[1] + values[2], (values[0], 'r'))
+
+# -----------------------------------------------------------
+# Parameters:   key (tuple): (columnar key, (x, 'r'))
+# Return:       canonical key (tuple): (key order, (x, 'r'))
+# -----------------------------------------------------------
 
-    return '', 'not found', (0, 'r')
+
+def get_canonicalKey_q4B(key):
+    return (get_canonicalKey_columnarTrans(key[0]), key[1])
+
+# -----------------------------------------------------------
+# Parameters:   None
+# Return:       layers (cascade.Cascade): decryption of Shift & Columnar
+#               Transposition, its decrypt takes the keys of
+#               cryptanalysis_q4B
+# Description:  Shift, then columnar transposition, cached so the shift
+#               is done once per x and the transposition once per shift
+#               and key order (2 letter keys only have 3 key orders)
+#               A new Cascade per search, so searches running at the same
+#               time do not share a cache
+# -----------------------------------------------------------
+
+
+def get_cascade_q4B():
+    return cascade.Cascade([(d_shift, None, 'substitution'),
+                            (d_columnarTrans, get_canonicalKey_columnarTrans, 'transposition')],
+                           splitKey=get_layerKeys_q4B)
+
+# -----------------------------------------------------------
+# Parameters:   key (tuple): (columnar key, (x, 'r'))
+# Return:       keys (tuple): ((x, 'r'), columnar key), the keys of the
+#               layers of get_cascade_q4B
+# -----------------------------------------------------------
+
+
+def get_layerKeys_q4B(key):
+    return (key[1], key[0])
 
 # -----------------------------------------------------------
 # Parameters:   ciphertext (str)
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#                       use segmentation.get_ratio if the plaintext has no spaces
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
 # Return:       plaintext (str)
 #               key (str)
 #               (x, 'r') (tuple)
 # Description:  Cryptanalysis of Hill
+#               All invertible keys made of the letters A-E are tried in order
 # -----------------------------------------------------------
 
 
-def cryptanalysis_q4C(ciphertext):
-    alphabet = utilities.get_lower()
-    dictList = utilities.load_dictionary('engmix.txt')
-    valid_keys = generate_valid_keys_q4C()
+@resultcache.cached('q4C')
+def cryptanalysis_q4C(ciphertext, scorer=None, **options):
+    if scorer is None:
+        scorer = utilities.load_dictionary('engmix.txt')
 
-    for key in valid_keys:
-        plaintext = d_hill(ciphertext, key)
-        if utilities.is_plaintext(plaintext, dictList, 0.9):
-            return plaintext, key.lower(), (0, 'r')
-    return '', 'not found', (0, 'r')
+    space = keysearch.KeySpace([(generate_valid_keys_q4C(),)], buildKey_q4C)
+    result = keysearch.KeySearch(space, d_hill, scorer, 0.9, **options).run(ciphertext)
+    values = (result[0], result[1].lower() if result[1] != '' else 'not found', (0, 'r'))
+    return keysearch.SearchResult(values, result.status, result.attempts, result.fraction,
+                                  result.ranked)
+
+# -----------------------------------------------------------
+# Parameters:   values (tuple): (key,)
+# Return:       key (str)
+# Description:  Key of cryptanalysis_q4C (see keysearch.KeySpace)
+# -----------------------------------------------------------
+
+
+def buildKey_q4C(values):
+    return values[0]
 
 # -----------------------------------------------------------
 # Parameters:   N/A
@@ -3182,11 +3631,11 @@ def d_mathCipher(ciphertext, key):
     b = key[1][1]
     c = key[1][2]
 
+    a_inv = mod.mul_inv(a, len(baseString))
+    b_inv = mod.mul_inv(b, len(baseString))
     for char in ciphertext:
         if char.lower() in baseString:
             index = baseString.index(char.lower())
-            a_inv = mod.mul_inv(a, len(baseString))
-            b_inv = mod.mul_inv(b, len(baseString))
             result = (a_inv * (b_inv * ((index + c) %
                                         len(baseString)) - b)) % len(baseString)
 
@@ -3199,30 +3648,34 @@ def d_mathCipher(ciphertext, key):
     return plaintext
 
 
+# -----------------------------------------------------------
+# Parameters:   baseString (str)
+# Return:       [total, illegal, noCipher, decimation, valid] (list)
+# Description:  Counts the mathCipher keys (a, b, c) of baseString,
+#               0 <= a, b, c < n = len(baseString), without listing them:
+#               illegal: a or b has no inverse mod n, so there are
+#                   n**3 - u**2 * n of them, u being the number of
+#                   invertible values (phi(n), or 0 for n = 1)
+#               For each of the u**2 invertible (a, b), b*(a+b) - c takes
+#               every value mod n once as c goes from 0 to n-1, so the
+#               congruences b*(a+b) - c = 1 and b*(a+b) - c = a have
+#               exactly one solution c each:
+#               decimation: b*(a+b) - c = a with a != 1 --> u * (u - 1)
+#               noCipher: b*(a+b) - c = 1 (u**2 keys), minus the
+#                   decimation count --> u**2 - u * (u - 1)
+#               valid: the other keys
+# -----------------------------------------------------------
+
+
 def analyze_mathCipher(baseString):
     # your code here
-    total = len(baseString) ** 3
-    valid = 0
-    illegal = 0
-    noCipher = 0
-    decimation = 0
-
-    for a in range(len(baseString)):
-        if not mod.has_mul_inv(a, len(baseString)):
-            illegal += len(baseString) ** 2
-        else:
-            for b in range(len(baseString)):
-                if not mod.has_mul_inv(b, len(baseString)):
-                    illegal += len(baseString)
-                else:
-                    for c in range(len(baseString)):
-                        if (b * (a + b) - c) % len(baseString) == 1:
-                            noCipher += 1
-                        elif (b * (a + b) - c) % len(baseString) == a:
-                            decimation += 1
-                        else:
-                            valid += 1
-    noCipher -= decimation
+    n = len(baseString)
+    total = n ** 3
+    units = mod.totient(n) if n > 1 else 0
+
+    illegal = total - units ** 2 * n
+    decimation = units * (units - 1)
+    noCipher = units ** 2 - decimation
     valid = total - illegal - noCipher - decimation
     return [total, illegal, noCipher, decimation, valid]
 
@@ -3275,29 +3728,123 @@ def stats_mathCipher():
     return
 
 
-def cryptanalysis_mathCipher(ciphertext):
+# -----------------------------------------------------------
+# Parameters:   values (tuple): (subString, a, b, c)
+# Return:       key (tuple) or None
+# Description:  Key of cryptanalysis_mathCipher (see keysearch.KeySpace)
+#               None for keys that do not encrypt or are a decimation
+#               cipher (checked mod len(baseString) as before)
+# -----------------------------------------------------------
+
+
+def buildKey_mathCipher(values):
+    subString, a, b, c = values
+    size = len(utilities.get_baseString())
+    if (b * (a + b) - c) % size == 1 or (b * (a + b) - c) % size == a:
+        return None
+    return (subString, [a, b, c])
+
+
+# -----------------------------------------------------------
+# Parameters:   n (int): length of the base string
+# Return:       keys (tuple of (a, b, c)): one key per affine equivalent
+# Description:  Keys of length n that cryptanalysis_mathCipher tries
+#               b*(a*x + b) - c is the affine map x --> (a*b)*x + (b*b - c)
+#               so keys with the same (a*b, b*b - c) mod n decrypt the same
+#               way (phi(n) keys for each of the phi(n)*n pairs)
+#               Each pair is given by its first valid key in the order
+#               a, b, c (see buildKey_mathCipher), and pairs are in the order
+#               of these keys: the first key that decrypts a ciphertext
+#               is the same as when all keys are tried
+# -----------------------------------------------------------
+
+
+@functools.lru_cache(maxsize=None)
+def get_affineKeys_mathCipher(n):
+    units = [i for i in range(n) if mod.has_mul_inv(i, n)]
+    seen = set()
+    keys = []
+    for a in units:
+        for b in units:
+            for c in range(n):
+                pair = (a * b % n, (b * b - c) % n)
+                if pair not in seen and buildKey_mathCipher(('', a, b, c)) is not None:
+                    seen.add(pair)
+                    keys.append((a, b, c))
+        if len(seen) == len(units) * n:
+            break
+    return tuple(keys)
+
+# -----------------------------------------------------------
+# Parameters:   key (tuple): (subString, [a, b, c])
+# Return:       keys (list): every valid key (see buildKey_mathCipher)
+#               that decrypts the same way as key, in the order a, b, c
+# -----------------------------------------------------------
+
+
+def get_equivalentKeys_mathCipher(key):
+    subString, (a, b, c) = key
+    n = len(subString)
+    alpha = a * b % n
+    beta = (b * b - c) % n
+    keys = []
+    for y in range(n):
+        if mod.has_mul_inv(y, n):
+            x = alpha * mod.mul_inv(y, n) % n
+            z = (y * y - beta) % n
+            if buildKey_mathCipher((subString, x, y, z)) is not None:
+                keys.append((subString, [x, y, z]))
+    return sorted(keys, key=lambda item: item[1])
+
+# -----------------------------------------------------------
+# Parameters:   values (tuple): (subString, (a, b, c))
+# Return:       key (tuple): (subString, [a, b, c])
+# Description:  Key of cryptanalysis_mathCipher (see keysearch.KeySpace)
+# -----------------------------------------------------------
+
+
+def buildKey_affineMathCipher(values):
+    return (values[0], list(values[1]))
+
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               scorer: dictionary or scorer function (see utilities.is_plaintext)
+#                       default is engmix.txt
+#               lengths: base string lengths to try (see get_baseLengths),
+#                   None --> 26 to 69 in order, 'infer' --> the likely ones
+#                   (see infer_baseLengths)
+#               options: passed to keysearch.KeySearch (e.g. workers, topK,
+#                        checkpoint, timeout, cancel), and cache
+#                        (see resultcache.cached)
+# Return:       plaintext (str)
+#               key (tuple): (subString, [a, b, c])
+# Description:  Cryptanalysis of mathCipher
+#               Base strings of length 26 to 69 are tried in order, each
+#               with one key per affine equivalent (see
+#               get_affineKeys_mathCipher), so attempts count these keys
+#               get_equivalentKeys_mathCipher(key) lists the keys that
+#               decrypt the same way as the key found
+# -----------------------------------------------------------
+
+
+@resultcache.cached('mathCipher')
+def cryptanalysis_mathCipher(ciphertext, scorer=None, lengths=None, **options):
     # your code here
     baseString = utilities.get_baseString()
-    string_length = len(utilities.get_lower())
-    dictList = utilities.load_dictionary('engmix.txt')
-    plaintext = ''
-    count = 0
-
-    while string_length < len(baseString):
-        for i in range(string_length):
-            if mod.has_mul_inv(i, string_length):
-                for j in range(string_length):
-                    if mod.has_mul_inv(j, string_length):
-                        for k in range(string_length):
-                            key = (baseString[:string_length], [i, j, k])
-                            if isValidKey_mathCipher(key) and (j * (i + j) - k) % len(baseString) != 1 and (j * (i + j) - k) % len(baseString) != i:
-                                count += 1
-                                plaintext = d_mathCipher(ciphertext, key)
-                                if utilities.is_plaintext(plaintext, dictList, 0.9):
-                                    print("key found after", count, "attempts")
-                                    return plaintext, key
-        string_length += 1
-    return '', 'not found'
+    if scorer is None:
+        scorer = utilities.load_dictionary('engmix.txt')
+
+    segments = []
+    for n in get_baseLengths(ciphertext, lengths):
+        segments.append(([baseString[:n]], get_affineKeys_mathCipher(n)))
+    space = keysearch.KeySpace(segments, buildKey_affineMathCipher)
+    result = keysearch.KeySearch(space, d_mathCipher, scorer, 0.9, **options).run(ciphertext)
+    if result.status == 'found':
+        print("key found after", result.attempts, "attempts")
+    elif result.status == 'not found':
+        result = keysearch.SearchResult(('', 'not found'), result.status, result.attempts, result.fraction,
+                                        result.ranked)
+    return result
 
 
 def LRM(b, e, m):
@@ -0,0 +1,410 @@
+import os
+import sys
+import math
+import mmap
+import atexit
+import struct
+import zlib
+import contextlib
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+
+# 1- Dictionary (class)
+# 2- MappedDictionary (class)
+# 3- get_indexFile(dictFile)
+# 4- build_index(dictFile, indexFile, falsePositive)
+# 5- load_dictionary(dictFile, mapped)
+# 6- as_dictionary(dictList)
+# 7- clear_cache()
+# 8- SharedDictionary (class)
+# 9- start_sharedDictionary(dictFile)
+# 10- attach_sharedDictionary(name)
+# 11- stop_sharedDictionary(dictList)
+# 12- shared_dictionary(dictFile)
+
+# dictionaries loaded so far, keyed by (absolute path, modification time, mapped)
+_cache = {}
+
+# shared memory dictionaries attached by this process, keyed by block name
+_attached = {}
+
+# Binary index layout (all integers are unsigned 32-bit little endian):
+#   header: magic 'CLD2', word count, table size (power of 2), filter bits
+#   filter: bitmap of filter bits (rounded up to bytes), bit
+#           crc32(word) % filterBits is set for every word
+#   table:  one slot per entry, 0 = empty, otherwise 1 + offset of the word in blob
+#   blob:   every word as one length byte followed by its ISO-8859-15 bytes
+# Slots are filled by linear probing starting at crc32(word) & (tableSize - 1)
+_MAGIC = b'CLD2'
+_HEADER = struct.Struct('<4sIII')
+_SLOT = struct.Struct('<I')
+_ENCODING = 'ISO-8859-15'
+
+# default part of the words not in the index that pass the filter
+_FALSE_POSITIVE = 0.05
+
+# -----------------------------------------------------------
+# Class:        Dictionary
+# Description:  Read-only set of dictionary words
+#               Membership is answered by a frozenset (hash lookup)
+#               so "word in dictionary" costs O(1) regardless of
+#               dictionary size
+#               Words are stored in lower case
+#               A dictionary loaded from a file pickles as its path,
+#               so worker processes reload it from their own cache
+#               instead of receiving a copy of every word
+# -----------------------------------------------------------
+
+
+class Dictionary:
+
+    def __init__(self, words, path=''):
+        self.words = frozenset(words)
+        self.path = path
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __reduce__(self):
+        if self.path != '':
+            return (load_dictionary, (self.path,))
+        return (Dictionary, (self.words,))
+
+# -----------------------------------------------------------
+# Class:        MappedDictionary
+# Description:  Read-only set of dictionary words backed by a binary index
+#               (see build_index) held in any buffer: an mmap of the
+#               index file or a shared memory block
+#               Nothing is decoded up front, "word in dictionary" hashes
+#               the word and compares a few bytes of the buffer
+#               A word whose bit is clear in the filter of the index is
+#               not looked up at all: most words of a wrong decryption
+#               cost one hash and one byte
+#               About 10 times slower per lookup than Dictionary, but the
+#               words are shared by every process mapping the same file
+#               instead of copied into each one: for memory-constrained use
+#               Words are stored in lower case
+#               Pickles as the path of the source word list
+# -----------------------------------------------------------
+
+
+class MappedDictionary:
+
+    def __init__(self, buffer, path=''):
+        magic, count, tableSize, filterBits = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError('Error (MappedDictionary): invalid index')
+        self.buffer = buffer
+        self.path = path
+        self.count = count
+        self.mask = tableSize - 1
+        self.filterBits = filterBits
+        self.tableStart = _HEADER.size + (filterBits + 7) // 8
+        self.blobStart = self.tableStart + tableSize * _SLOT.size
+
+    def __contains__(self, word):
+        try:
+            b = word.encode(_ENCODING)
+        except (UnicodeEncodeError, AttributeError):
+            return False
+        buffer = self.buffer
+        size = len(b)
+        h = zlib.crc32(b)
+        bit = h % self.filterBits
+        if not buffer[_HEADER.size + (bit >> 3)] >> (bit & 7) & 1:
+            return False
+        slot = h & self.mask
+        while True:
+            entry = _SLOT.unpack_from(buffer, self.tableStart + slot * _SLOT.size)[0]
+            if entry == 0:
+                return False
+            start = self.blobStart + entry - 1
+            if buffer[start] == size and buffer[start + 1:start + 1 + size] == b:
+                return True
+            slot = (slot + 1) & self.mask
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        buffer = self.buffer
+        pos = self.blobStart
+        for i in range(self.count):
+            size = buffer[pos]
+            yield bytes(buffer[pos + 1:pos + 1 + size]).decode(_ENCODING)
+            pos += size + 1
+
+    def __reduce__(self):
+        return (load_dictionary, (self.path, True))
+
+# -----------------------------------------------------------
+# Parameters:   dictFile (string): filename
+# Return:       indexFile (string)
+# Description:  Returns the name of the binary index built for a word list
+#               e.g. engmix.txt --> engmix.idx
+# -----------------------------------------------------------
+
+
+def get_indexFile(dictFile):
+    return os.path.splitext(dictFile)[0] + '.idx'
+
+# -----------------------------------------------------------
+# Parameters:   dictFile (string): word list, one word per line
+#               indexFile (string): output file, '' for get_indexFile(dictFile)
+#               falsePositive (float): part of the words not in the list
+#                   that pass the filter of the index, default is 0.05
+#                   (about 20 bits per word, lower costs more bits)
+# Return:       indexFile (string)
+# Description:  Compiles a word list into the binary index read by
+#               MappedDictionary
+#               Words longer than 255 bytes (the most a length byte can
+#               tell) are skipped, they are never found in the index
+#               The index is written to a temporary file and renamed,
+#               so processes reading the old index are not disturbed
+# -----------------------------------------------------------
+
+
+def build_index(dictFile, indexFile='', falsePositive=_FALSE_POSITIVE):
+    if indexFile == '':
+        indexFile = get_indexFile(dictFile)
+
+    inFile = open(dictFile, 'r', encoding=_ENCODING)
+    words = sorted(set(w.strip('\n').lower() for w in inFile if w.strip('\n') != ''))
+    inFile.close()
+    words = [w for w in words if len(w.encode(_ENCODING)) <= 255]
+
+    tableSize = 1
+    while tableSize < 2 * len(words):
+        tableSize *= 2
+    # one bit per word: a miss passes with probability 1 - exp(-words / bits)
+    filterBits = max(8, math.ceil(len(words) / -math.log(1 - falsePositive)))
+    bitmap = bytearray((filterBits + 7) // 8)
+    table = [0] * tableSize
+    blob = bytearray()
+    for word in words:
+        b = word.encode(_ENCODING)
+        h = zlib.crc32(b)
+        bitmap[(h % filterBits) >> 3] |= 1 << (h % filterBits & 7)
+        slot = h & (tableSize - 1)
+        while table[slot] != 0:
+            slot = (slot + 1) & (tableSize - 1)
+        table[slot] = len(blob) + 1
+        blob += bytes([len(b)]) + b
+
+    tempFile = indexFile + '.tmp' + str(os.getpid())
+    outFile = open(tempFile, 'wb')
+    outFile.write(_HEADER.pack(_MAGIC, len(words), tableSize, filterBits))
+    outFile.write(bitmap)
+    outFile.write(struct.pack('<' + str(tableSize) + 'I', *table))
+    outFile.write(blob)
+    outFile.close()
+    os.replace(tempFile, indexFile)
+    return indexFile
+
+# -----------------------------------------------------------
+# Parameters:   indexFile (string)
+# Return:       True if the index has the format of this version
+# -----------------------------------------------------------
+
+
+def _is_current(indexFile):
+    inFile = open(indexFile, 'rb')
+    magic = inFile.read(len(_MAGIC))
+    inFile.close()
+    return magic == _MAGIC
+
+# -----------------------------------------------------------
+# Parameters:   dictFile (string): filename
+#               mapped (bool): False --> Dictionary (default)
+#                   True --> MappedDictionary: the binary index of the
+#                   file opened with mmap, (re)built when missing, older
+#                   than dictFile or in an older format
+# Return:       dictionary (Dictionary or MappedDictionary)
+# Description:  Reads a dictionary file, one word per line
+#               The same object is returned by every later call in the process
+#               If the file is modified on disk, it is read again
+# -----------------------------------------------------------
+
+
+def load_dictionary(dictFile, mapped=False):
+    path = os.path.abspath(dictFile)
+    mtime = os.path.getmtime(path)
+    key = (path, mtime, mapped)
+    if key in _cache:
+        return _cache[key]
+
+    if mapped:
+        indexFile = get_indexFile(path)
+        if not os.path.exists(indexFile) or os.path.getmtime(indexFile) < mtime or \
+                not _is_current(indexFile):
+            build_index(path, indexFile)
+        inFile = open(indexFile, 'rb')
+        buffer = mmap.mmap(inFile.fileno(), 0, access=mmap.ACCESS_READ)
+        inFile.close()
+        dictList = MappedDictionary(buffer, path)
+    else:
+        inFile = open(path, 'r', encoding=_ENCODING)
+        words = [w.strip('\n').lower() for w in inFile if w.strip('\n') != '']
+        inFile.close()
+        dictList = Dictionary(words, path)
+
+    # drop copies of older versions of the same file
+    for oldKey in [k for k in _cache if k[0] == path and k[2] == mapped]:
+        del _cache[oldKey]
+    _cache[key] = dictList
+    return _cache[key]
+
+# -----------------------------------------------------------
+# Parameters:   dictList: filename (string), Dictionary, list of words,
+#                         or list of lists of words (old format)
+# Return:       dictionary (Dictionary or MappedDictionary)
+# Description:  Converts any accepted form of a dictionary to a dictionary object
+#               A filename is loaded through the process-wide cache
+#               Any other object supporting "word in dictList" is returned as is
+# -----------------------------------------------------------
+
+
+def as_dictionary(dictList):
+    if isinstance(dictList, str):
+        return load_dictionary(dictList)
+    if isinstance(dictList, list):
+        if all(isinstance(item, str) for item in dictList):
+            return Dictionary(w.lower() for w in dictList)
+        return Dictionary(w.lower() for bucket in dictList for w in bucket)
+    return dictList
+
+# -----------------------------------------------------------
+# Parameters:   None
+# Return:       None
+# Description:  Forgets all loaded dictionaries
+# -----------------------------------------------------------
+
+
+def clear_cache():
+    _cache.clear()
+    return
+
+# -----------------------------------------------------------
+# Class:        SharedDictionary
+# Description:  MappedDictionary whose index lives in a shared memory block
+#               (multiprocessing.shared_memory), read-only
+#               Pickles as the name of the block: a worker process that
+#               receives it attaches to the same block instead of loading
+#               or copying the dictionary, so a pool of any size holds
+#               one copy of the index
+# -----------------------------------------------------------
+
+
+class SharedDictionary(MappedDictionary):
+
+    def __init__(self, block, path=''):
+        MappedDictionary.__init__(self, block.buf.toreadonly(), path)
+        self.block = block
+        self.name = block.name
+
+    def __reduce__(self):
+        return (attach_sharedDictionary, (self.name,))
+
+# -----------------------------------------------------------
+# Parameters:   dictFile (string): filename
+# Return:       dictionary (SharedDictionary)
+# Description:  Copies the binary index of a dictionary (see load_dictionary)
+#               into a new shared memory block
+#               The block stays alive until stop_sharedDictionary is called
+#               Pass the returned object to worker processes (e.g. as the
+#               scorer of a cryptanalysis function), not the filename
+# -----------------------------------------------------------
+
+
+def start_sharedDictionary(dictFile):
+    words = load_dictionary(dictFile, True)
+    block = shared_memory.SharedMemory(create=True, size=len(words.buffer))
+    block.buf[:len(words.buffer)] = words.buffer
+    dictList = SharedDictionary(block, words.path)
+    _attached[block.name] = dictList
+    return dictList
+
+# -----------------------------------------------------------
+# Parameters:   name (string): name of the shared memory block
+# Return:       dictionary (SharedDictionary)
+# Description:  Attaches to a block made by start_sharedDictionary
+#               Each process attaches once, later calls reuse it
+#               An attached process never removes the block, only the
+#               process that started it does
+#               Child processes (multiprocessing) share the resource tracker
+#               of their parent, which already tracks the block; any other
+#               process has its own tracker, which must not remove the
+#               block when that process exits (on Python 3.13+ the block
+#               is simply attached untracked)
+# -----------------------------------------------------------
+
+
+def attach_sharedDictionary(name):
+    if name in _attached:
+        return _attached[name]
+    if sys.version_info >= (3, 13):
+        block = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        block = shared_memory.SharedMemory(name=name)
+        if multiprocessing.parent_process() is None:
+            resource_tracker.unregister(block._name, 'shared_memory')
+    _attached[name] = SharedDictionary(block)
+    return _attached[name]
+
+# -----------------------------------------------------------
+# Parameters:   None
+# Return:       None
+# Description:  Closes the blocks attached by this process when it exits
+#               (a block still viewed by the dictionary can not be closed
+#               by the garbage collector)
+# -----------------------------------------------------------
+
+
+def _detach_all():
+    for dictList in list(_attached.values()):
+        dictList.buffer.release()
+        dictList.block.close()
+    _attached.clear()
+    return
+
+
+atexit.register(_detach_all)
+
+# -----------------------------------------------------------
+# Parameters:   dictList (SharedDictionary): from start_sharedDictionary
+# Return:       None
+# Description:  Closes and removes the shared memory block
+#               Workers must not use the dictionary afterwards
+# -----------------------------------------------------------
+
+
+def stop_sharedDictionary(dictList):
+    _attached.pop(dictList.name, None)
+    # release the views on the block before closing it
+    dictList.buffer.release()
+    dictList.block.close()
+    dictList.block.unlink()
+    return
+
+# -----------------------------------------------------------
+# Parameters:   dictFile (string): filename
+# Return:       dictionary (SharedDictionary)
+# Description:  Context manager around start/stop_sharedDictionary
+#               with dictionary.shared_dictionary('engmix.txt') as d:
+#                   pool.map(..., d ...)
+# -----------------------------------------------------------
+
+
+@contextlib.contextmanager
+def shared_dictionary(dictFile):
+    dictList = start_sharedDictionary(dictFile)
+    try:
+        yield dictList
+    finally:
+        stop_sharedDictionary(dictList)
@@ -0,0 +1,367 @@
+import os
+import time
+import heapq
+import pickle
+import threading
+import multiprocessing
+import multiprocessing.connection
+import keysearch
+
+# 1- Coordinator (class)
+# 2- run_worker(address, authkey)
+# 3- run_distributed(search, ciphertext, workers, authkey, unitTimeout)
+
+# -----------------------------------------------------------
+# Class:        Coordinator
+# Description:  Runs a keysearch.KeySearch on worker processes that
+#               connect to it over TCP (see run_worker)
+#               Connections use multiprocessing.connection: messages are
+#               pickled, and a worker must know authkey to connect, so the
+#               coordinator should only listen on localhost or a trusted
+#               network
+#               authkey: default is a random key (self.authkey), an empty
+#                   key would let any process connect and is refused
+# Errors:       if authkey is empty --> raise ValueError
+#               The key space is split into units (the chunks of the
+#               KeySearch), handed out in key order, one at a time to
+#               each worker
+#               Once a unit finds a key, the units after it are not handed
+#               out anymore and the workers running them are told to stop
+#               at their next batch
+#               A unit is handed out again if its worker disconnects, or
+#               if it is not done after unitTimeout seconds; the first
+#               result of a unit is the one kept
+#               maxFailures: times a unit can be lost before run fails
+#               If decrypt, build or the scorer raises in a worker, run
+#               raises the same exception, as KeySearch.run does
+#               The result is the same as KeySearch.run: first winning key
+#               in key order, topK, checkpoint, timeout and cancel work
+#               the same way (the workers of the KeySearch are not used)
+#               The search (decrypt, build, scorer) is sent to the workers
+#               by reference, so they must be able to import the same modules
+# -----------------------------------------------------------
+
+
+class Coordinator:
+
+    def __init__(self, search, address=('localhost', 0), authkey=None, unitTimeout=60,
+                 maxFailures=3):
+        if authkey is None:
+            authkey = os.urandom(32)
+        if len(authkey) == 0:
+            raise ValueError('Error (Coordinator): authkey must not be empty')
+        self.search = search
+        self.authkey = authkey
+        self.unitTimeout = unitTimeout
+        self.maxFailures = maxFailures
+        self.listener = multiprocessing.connection.Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self._lock = threading.Condition()
+        self._closed = False
+        self._connections = []
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    #               processes (list): local worker processes (see
+    #                   run_distributed), default is None
+    # Return:       result (keysearch.SearchResult)
+    # Description:  Serves the workers until the search ends, then
+    #               stops listening (run can only be called once)
+    # Errors:       the exception raised by a worker --> raise it again
+    #               if a unit is lost maxFailures times, or all processes
+    #               exit before the search ends --> raise RuntimeError
+    # -----------------------------------------------------------
+    def run(self, ciphertext, processes=None):
+        search = self.search
+        size = len(search.space)
+        if search.timeout is not None:
+            search._deadline = time.monotonic() + search.timeout
+        state = search._load_checkpoint(ciphertext, size)
+        self._ciphertext = ciphertext
+        self._chunks = search._get_chunks(state['cursor'], size)
+        self._queue = list(range(len(self._chunks)))
+        self._issued = {}
+        self._failures = {}
+        self._error = None
+        self._outcomes = [None] * len(self._chunks)
+        self._stop = keysearch._NO_HIT
+        self._finished = False
+        search._saved = time.monotonic()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+        done = 0
+        winner = None
+        interrupted = None
+        with self._lock:
+            while True:
+                if interrupted is None and search._is_interrupted():
+                    interrupted = time.monotonic()
+                    self._set_stop(-1)
+                now = time.monotonic()
+                for c in list(self._issued):
+                    if now - self._issued[c] >= self.unitTimeout and c not in self._queue:
+                        self._issued[c] = now
+                        self._requeue(c)
+                while done < len(self._chunks) and self._outcomes[done] is not None:
+                    if self._outcomes[done]['status'] == 'stopped':
+                        break
+                    if self._outcomes[done]['status'] == 'found' and search.topK == 0:
+                        winner = self._outcomes[done]
+                        break
+                    search._advance(ciphertext, state, self._chunks[done], self._outcomes[done])
+                    done += 1
+                if winner is not None or done == len(self._chunks):
+                    break
+                if self._error is None and processes is not None and \
+                        not any(process.is_alive() for process in processes):
+                    self._error = RuntimeError('Error (Coordinator): all worker processes exited')
+                if self._error is not None:
+                    break
+                # once interrupted, wait for the running units to stop
+                if interrupted is not None and (self._issued == {} or
+                                                now - interrupted >= self.unitTimeout):
+                    break
+                self._lock.wait(0.05)
+            self._finished = True
+            self._set_stop(-1)
+            self._lock.notify_all()
+        self._closed = True
+        self.listener.close()
+        if self._error is not None:
+            raise self._error
+
+        partial = None
+        if winner is None and interrupted is not None and done < len(self._chunks):
+            partial = [outcome for outcome in self._outcomes[done:] if outcome is not None]
+        return search._get_result(ciphertext, state, winner, partial)
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       None
+    # Description:  Accepts worker connections, each one served by its
+    #               own thread, until the listener is closed
+    # -----------------------------------------------------------
+    def _accept(self):
+        while not self._closed:
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                continue
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   connection (multiprocessing.connection.Connection)
+    # Return:       None
+    # Description:  Sends the search to a worker, then one unit at a time
+    #               until there is nothing left to do
+    #               Messages sent: ('search', search, ciphertext, stop),
+    #               ('unit', c, chunk), ('stop', c), ('done',)
+    #               Messages received: ('ready',), ('result', c, outcome),
+    #               ('error', c, exception)
+    #               Everything is sent holding the lock, so units and stop
+    #               messages never mix on a connection
+    # -----------------------------------------------------------
+    def _serve(self, connection):
+        unit = None
+        try:
+            with self._lock:
+                connection.send(('search', self.search, self._ciphertext, self._stop))
+                self._connections.append(connection)
+            while True:
+                message = connection.recv()
+                with self._lock:
+                    if message[0] == 'result':
+                        self._add_outcome(message[1], message[2])
+                        unit = None
+                    elif message[0] == 'error':
+                        if self._error is None:
+                            self._error = message[2]
+                        unit = None
+                        self._lock.notify_all()
+                    unit = self._get_unit()
+                    if unit is None:
+                        connection.send(('done',))
+                        break
+                    self._issued[unit] = time.monotonic()
+                    connection.send(('unit', unit, self._chunks[unit]))
+        except (EOFError, OSError):
+            # lost worker: its unit goes back in the queue
+            with self._lock:
+                if unit is not None and self._outcomes[unit] is None:
+                    self._issued.pop(unit, None)
+                    self._requeue(unit)
+                    self._lock.notify_all()
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+        connection.close()
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   c (int): unit number
+    #               outcome (dict): its KeySearch.search_chunk result
+    # Return:       None
+    # Description:  Keeps the first result of a unit, and stops the units
+    #               after it if it found a key
+    # -----------------------------------------------------------
+    def _add_outcome(self, c, outcome):
+        self._issued.pop(c, None)
+        if self._outcomes[c] is None:
+            self._outcomes[c] = outcome
+            self.search._add_counts(outcome)
+            if self.search.progress is not None:
+                self.search.progress(outcome['tried'])
+        if outcome['status'] == 'found' and self.search.topK == 0 and c < self._stop:
+            self._set_stop(c)
+        self._lock.notify_all()
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       c (int): next unit to hand out, None if there is none
+    #               left (waits while other workers still run units that
+    #               could come back in the queue)
+    # Description:  Called holding the lock
+    # -----------------------------------------------------------
+    def _get_unit(self):
+        while not self._finished and self._error is None:
+            while self._queue != []:
+                c = heapq.heappop(self._queue)
+                if self._outcomes[c] is None and c < self._stop:
+                    return c
+            if self._issued == {}:
+                return None
+            self._lock.wait(0.05)
+        return None
+
+    # -----------------------------------------------------------
+    # Parameters:   c (int): units after c must stop (-1 for all of them)
+    # Return:       None
+    # Description:  Called holding the lock
+    # -----------------------------------------------------------
+    def _set_stop(self, c):
+        self._stop = min(self._stop, c)
+        for connection in self._connections:
+            try:
+                connection.send(('stop', self._stop))
+            except OSError:
+                pass
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   c (int): unit that was lost
+    # Return:       None
+    # Description:  Puts the unit back in the queue, or ends the search
+    #               with an error once it has been lost maxFailures times
+    #               Called holding the lock
+    # -----------------------------------------------------------
+    def _requeue(self, c):
+        self._failures[c] = self._failures.get(c, 0) + 1
+        if self._failures[c] >= self.maxFailures:
+            if self._error is None:
+                self._error = RuntimeError('Error (Coordinator): unit ' + str(c) + ' failed ' +
+                                           str(self._failures[c]) + ' times')
+        elif c not in self._queue:
+            heapq.heappush(self._queue, c)
+        return
+
+# -----------------------------------------------------------
+# Class:        _RemoteStop
+# Description:  Stop marker of a worker process, used by
+#               KeySearch.search_chunk like the shared value of its
+#               process pool: value is the lowest unit that found a key,
+#               updated from the stop messages of the coordinator
+# -----------------------------------------------------------
+
+
+class _RemoteStop:
+
+    def __init__(self, connection, value):
+        self.connection = connection
+        self.limit = value
+
+    @property
+    def value(self):
+        while self.connection.poll():
+            message = self.connection.recv()
+            if message[0] == 'stop':
+                self.limit = min(self.limit, message[1])
+        return self.limit
+
+# -----------------------------------------------------------
+# Parameters:   address: (host, port) of the Coordinator
+#               authkey (bytes): same as the Coordinator
+# Return:       None
+# Description:  Worker process: runs the units the coordinator sends
+#               until it has no more, or the connection is lost
+#               An exception raised by a unit is sent to the coordinator
+#               (as a RuntimeError with its repr if it cannot be pickled)
+# -----------------------------------------------------------
+
+
+def run_worker(address, authkey):
+    connection = multiprocessing.connection.Client(address, authkey=authkey)
+    try:
+        message = connection.recv()
+        search, ciphertext = message[1], message[2]
+        stop = _RemoteStop(connection, message[3])
+        keysearch._stop = stop
+        connection.send(('ready',))
+        while True:
+            message = connection.recv()
+            if message[0] == 'stop':
+                stop.limit = min(stop.limit, message[1])
+            elif message[0] == 'unit':
+                try:
+                    outcome = keysearch._search_chunk(search, ciphertext, message[1], message[2])
+                except Exception as error:
+                    try:
+                        connection.send(('error', message[1], error))
+                    except (pickle.PicklingError, TypeError, AttributeError):
+                        connection.send(('error', message[1], RuntimeError(repr(error))))
+                    continue
+                connection.send(('result', message[1], outcome))
+            else:
+                break
+    except (EOFError, OSError):
+        pass
+    finally:
+        connection.close()
+    return
+
+# -----------------------------------------------------------
+# Parameters:   search (keysearch.KeySearch)
+#               ciphertext (str)
+#               workers (int): worker processes to start, default is
+#                   search.workers
+#               authkey (bytes): default is a random key
+#               unitTimeout (int): seconds before a unit is handed out again
+# Return:       result (keysearch.SearchResult)
+# Description:  Runs a Coordinator on localhost with its workers as
+#               local processes; fails if they all exit before the
+#               search ends (see Coordinator.run)
+#               More workers, on this or other machines, can connect with
+#               run_worker(coordinator.address, authkey) when the
+#               Coordinator is used directly
+# -----------------------------------------------------------
+
+
+def run_distributed(search, ciphertext, workers=None, authkey=None, unitTimeout=60):
+    if workers is None:
+        workers = search.workers
+    coordinator = Coordinator(search, ('localhost', 0), authkey, unitTimeout)
+    processes = [multiprocessing.Process(target=run_worker,
+                                         args=(coordinator.address, coordinator.authkey))
+                 for i in range(max(workers, 1))]
+    for process in processes:
+        process.start()
+    try:
+        result = coordinator.run(ciphertext, processes)
+    finally:
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+    return result
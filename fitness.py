@@ -0,0 +1,254 @@
+import os
+import string
+import numpy as np
+
+# 1- load_quadgrams(corpusFile)
+# 2- build_quadgrams(corpusFile, tableFile)
+# 3- text_to_codes(text)
+# 4- score(text, corpusFile)
+# 5- score_many(texts, corpusFile)
+# 6- get_ratio(text, corpusFile)
+# 7- get_ratios(texts, corpusFile)
+# 8- is_plaintext(text, threshold, corpusFile)
+
+# quadgram tables loaded so far, keyed by (absolute path, modification time)
+_cache = {}
+
+# weights of the 4 letters of a quadgram in its table index
+_WEIGHTS = np.array([26**3, 26**2, 26, 1], dtype=np.int64)
+
+# ratio 1 is set at this percentile of the average scores of held-out
+# English windows of _WINDOW letters (about one short sentence)
+_PERCENTILE = 5
+_WINDOW = 32
+
+# removes letters and spaces, what is left are symbols (see get_ratios)
+_SYMBOL_TABLE = str.maketrans('', '', string.ascii_letters + string.whitespace)
+
+# letters per symbol English text uses at most (punctuation, digits)
+_LETTERS_PER_SYMBOL = 8
+
+# -----------------------------------------------------------
+# Parameters:   corpusFile (string): English text
+#               tableFile (string): output file
+# Return:       None
+# Description:  Counts every quadgram (4 consecutive letters, ignoring
+#               case and all non-alpha characters) in the corpus and saves
+#               log10 probabilities as a dense float32 array of 26^4 entries
+#               Entry ((a*26+b)*26+c)*26+d is the quadgram abcd (a=0,..,z=25)
+#               Quadgrams never seen in the corpus get log10(0.01/N)
+#               Also saves the average quadgram score of English text the
+#               table has not seen: each half of the corpus is cut into
+#               windows of _WINDOW letters, scored with a table built from
+#               the other half, and the _PERCENTILE-th percentile of the
+#               window averages is kept, so almost every English sentence
+#               scores at least as well
+# -----------------------------------------------------------
+
+
+def build_quadgrams(corpusFile, tableFile):
+    inFile = open(corpusFile, 'r', encoding='utf8')
+    codes = text_to_codes(inFile.read())
+    inFile.close()
+
+    table = _get_table(_get_indices(codes))
+    half = len(codes) // 2
+    means = []
+    for part, other in ((codes[:half], codes[half:]), (codes[half:], codes[:half])):
+        otherTable = _get_table(_get_indices(other))
+        for start in range(0, len(part) - _WINDOW + 1, _WINDOW):
+            means.append(otherTable[_get_indices(part[start:start + _WINDOW])].mean(dtype=np.float64))
+    englishScore = np.percentile(means, _PERCENTILE)
+
+    tempFile = tableFile + '.tmp' + str(os.getpid()) + '.npz'
+    np.savez(tempFile, table=table, englishScore=np.float64(englishScore))
+    os.replace(tempFile, tableFile)
+    return
+
+# -----------------------------------------------------------
+# Parameters:   indices (numpy array): quadgram indices of a text
+# Return:       table (numpy array)
+# Description:  log10 probabilities of all 26^4 quadgrams in the text
+# -----------------------------------------------------------
+
+
+def _get_table(indices):
+    counts = np.bincount(indices, minlength=26**4).astype(np.float64)
+    total = counts.sum()
+    table = np.full(26**4, np.log10(0.01/total))
+    seen = counts > 0
+    table[seen] = np.log10(counts[seen]/total)
+    return table.astype(np.float32)
+
+# -----------------------------------------------------------
+# Parameters:   corpusFile (string): English text
+# Return:       (table, floor, englishScore)
+#               table (numpy array): 26^4 log10 probabilities
+#               floor (float): score of an unseen quadgram
+#               englishScore (float): average quadgram score reached by
+#                   almost every English sentence (see build_quadgrams)
+# Description:  Loads the quadgram table of a corpus
+#               The table is built once and saved next to the corpus
+#               (corpus.txt --> corpus.npz), it is rebuilt when the corpus
+#               is newer or the file was saved by an older version.
+#               Each process loads the table only once.
+# -----------------------------------------------------------
+
+
+def load_quadgrams(corpusFile='corpus.txt'):
+    path = os.path.abspath(corpusFile)
+    mtime = os.path.getmtime(path)
+    key = (path, mtime)
+    if key in _cache:
+        return _cache[key]
+
+    tableFile = os.path.splitext(path)[0] + '.npz'
+    if not os.path.exists(tableFile) or os.path.getmtime(tableFile) < mtime:
+        build_quadgrams(path, tableFile)
+    data = np.load(tableFile)
+    if 'englishScore' not in data:
+        build_quadgrams(path, tableFile)
+        data = np.load(tableFile)
+    table = data['table']
+    _cache[key] = (table, float(table.min()), float(data['englishScore']))
+    return _cache[key]
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+# Return:       codes (numpy array)
+# Description:  Converts the letters of a text to numbers a=0,..,z=25
+#               Case is ignored, all other characters are removed
+# -----------------------------------------------------------
+
+
+def text_to_codes(text):
+    raw = np.frombuffer(text.lower().encode('ascii', 'ignore'), dtype=np.uint8)
+    return raw[(raw >= 97) & (raw <= 122)].astype(np.int64) - 97
+
+# -----------------------------------------------------------
+# Parameters:   codes (numpy array): output of text_to_codes
+# Return:       indices (numpy array)
+# Description:  Table index of every quadgram in codes
+# -----------------------------------------------------------
+
+
+def _get_indices(codes):
+    if len(codes) < 4:
+        return np.zeros(0, dtype=np.int64)
+    n = len(codes) - 3
+    return (codes[:n]*_WEIGHTS[0] + codes[1:n+1]*_WEIGHTS[1] +
+            codes[2:n+2]*_WEIGHTS[2] + codes[3:n+3])
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+#               corpusFile (string)
+# Return:       score (float)
+# Description:  Log-likelihood of a text being English:
+#               sum of log10 probabilities of all its quadgrams
+#               Higher (closer to 0) is more English-like
+#               Texts with less than 4 letters score 0
+# -----------------------------------------------------------
+
+
+def score(text, corpusFile='corpus.txt'):
+    table = load_quadgrams(corpusFile)[0]
+    return float(table[_get_indices(text_to_codes(text))].sum(dtype=np.float64))
+
+# -----------------------------------------------------------
+# Parameters:   texts (list of strings)
+#               corpusFile (string)
+# Return:       scores (numpy array of floats)
+# Description:  score() of every text, computed with a single gather
+#               over the quadgrams of all texts together
+# -----------------------------------------------------------
+
+
+def score_many(texts, corpusFile='corpus.txt'):
+    table = load_quadgrams(corpusFile)[0]
+    return _sum_many(texts, table)[0]
+
+# -----------------------------------------------------------
+# Parameters:   texts (list of strings)
+#               table (numpy array)
+# Return:       (sums, counts) (numpy arrays)
+# Description:  Sum of quadgram scores and number of quadgrams of every text
+# -----------------------------------------------------------
+
+
+def _sum_many(texts, table):
+    indexList = [_get_indices(text_to_codes(t)) for t in texts]
+    counts = np.array([len(i) for i in indexList], dtype=np.int64)
+    sums = np.zeros(len(texts))
+    if counts.sum() == 0:
+        return sums, counts
+    values = table[np.concatenate(indexList)].astype(np.float64)
+    # reduceat needs a start inside the array for every non-empty text
+    nonEmpty = counts > 0
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    sums[nonEmpty] = np.add.reduceat(values, starts[nonEmpty])
+    return sums, counts
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+#               corpusFile (string)
+# Return:       ratio (float): number between 0 to 1
+# Description:  Average quadgram score of a text on a 0 to 1 scale:
+#               0 --> every quadgram unseen in English
+#               1 --> as English-like as all but the least English-like
+#                   _PERCENTILE% of English sentences (see build_quadgrams)
+#               Symbols (not letters or spaces) beyond one per
+#               _LETTERS_PER_SYMBOL letters count as unseen quadgrams, so a
+#               decryption made mostly of symbols does not score on its few
+#               letters
+#               English sentences almost always score above 0.9, random
+#               letters and wrong decryptions well below, so it can be used
+#               as a scorer with the 0.9 threshold of the cryptanalysis
+#               functions (see utilities.is_plaintext)
+#               Texts with less than 4 letters --> 0
+# -----------------------------------------------------------
+
+
+def get_ratio(text, corpusFile='corpus.txt'):
+    return float(get_ratios([text], corpusFile)[0])
+
+# -----------------------------------------------------------
+# Parameters:   texts (list of strings)
+#               corpusFile (string)
+# Return:       ratios (numpy array of floats)
+# Description:  get_ratio() of every text, computed with score_many
+# -----------------------------------------------------------
+
+
+def get_ratios(texts, corpusFile='corpus.txt'):
+    table, floor, englishScore = load_quadgrams(corpusFile)
+    sums, counts = _sum_many(texts, table)
+    symbols = np.array([len(t.translate(_SYMBOL_TABLE)) for t in texts], dtype=np.int64)
+    # counts + 3 letters for a text with quadgrams
+    others = np.maximum(symbols - (counts + 3) // _LETTERS_PER_SYMBOL, 0)
+    ratios = np.zeros(len(texts))
+    nonEmpty = counts > 0
+    means = ((sums[nonEmpty] + floor * others[nonEmpty]) /
+             (counts[nonEmpty] + others[nonEmpty]))
+    ratios[nonEmpty] = np.clip((means - floor) / (englishScore - floor), 0, 1)
+    return ratios
+
+
+# lets utilities.score_candidates score a whole batch with get_ratios
+get_ratio.many = get_ratios
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+#               threshold (float): number between 0 to 1
+#               corpusFile (string)
+# Return:       True/False
+# Description:  Quadgram alternative to utilities.is_plaintext
+#               Works on texts without spaces between words
+#               If get_ratio(text) >= threshold --> True
+#               If invalid threshold given, default is 0.7
+# -----------------------------------------------------------
+
+
+def is_plaintext(text, threshold, corpusFile='corpus.txt'):
+    if threshold < 0 or threshold > 1:
+        threshold = 0.7
+    return get_ratio(text, corpusFile) >= threshold
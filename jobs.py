@@ -0,0 +1,234 @@
+import time
+import asyncio
+import inspect
+import functools
+import threading
+import concurrent.futures
+import keysearch
+import substitution
+import cryptography_library
+
+# 1- Job (class)
+# 2- JobService (class)
+# 3- get_function(cipher)
+
+# modules searched by name for cryptanalysis functions
+_MODULES = (cryptography_library, substitution)
+# options given by JobService to every job
+_JOB_OPTIONS = ('cancel', 'progress')
+
+# -----------------------------------------------------------
+# Class:        Job
+# Description:  Handle of a cryptanalysis job submitted to a JobService
+#               await job --> the result of the cryptanalysis function
+#               (a keysearch.SearchResult)
+#               status (str): 'queued', 'running', 'done', 'cancelled'
+#                   or 'failed' (the function raised an exception, which
+#                   await job raises again)
+#               tried (int): keys scored so far
+# -----------------------------------------------------------
+
+
+class Job:
+
+    def __init__(self, function, ciphertext, options, future):
+        self.function = function
+        self.ciphertext = ciphertext
+        self.options = options
+        self.status = 'queued'
+        self.tried = 0
+        self._future = future
+        self._cancel = threading.Event()
+        self._started = None
+        self._ended = None
+
+    def __await__(self):
+        return asyncio.shield(self._future).__await__()
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       (tried, rate): keys scored so far and keys per second
+    #               since the job started running (0 while queued)
+    # -----------------------------------------------------------
+    def get_progress(self):
+        if self._started is None:
+            return self.tried, 0
+        end = self._ended if self._ended is not None else time.monotonic()
+        elapsed = end - self._started
+        return self.tried, self.tried / elapsed if elapsed > 0 else 0
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       None
+    # Description:  A queued job is dropped, its result is an empty
+    #               SearchResult with status 'cancelled'
+    #               A running job stops at its next batch and its result
+    #               is the best key found so far (see keysearch.KeySearch)
+    # -----------------------------------------------------------
+    def cancel(self):
+        self._cancel.set()
+        if self.status == 'queued':
+            self.status = 'cancelled'
+            if not self._future.done():
+                self._future.set_result(keysearch.SearchResult(('', ''), 'cancelled', 0, 0))
+        return
+
+    # progress function of the search, runs in the executor
+    def _add_tried(self, count):
+        self.tried += count
+        return
+
+# -----------------------------------------------------------
+# Class:        JobService
+# Description:  Runs cryptanalysis functions for asyncio code without
+#               blocking the event loop
+#               submit() puts a job in a queue and returns its Job at once;
+#               at most maxJobs jobs run at the same time, each one in a
+#               thread of the executor, the others wait in submit order
+#               A job runs its search in its executor thread unless its
+#               options give workers (see keysearch.KeySearch), so a
+#               burst of jobs does not use more than maxJobs cores
+#               maxJobs: jobs running at the same time (default 1)
+#               executor: concurrent.futures executor of the jobs,
+#                   default is a ThreadPoolExecutor of maxJobs threads
+#               Must be used from a running event loop; close() stops it
+# -----------------------------------------------------------
+
+
+class JobService:
+
+    def __init__(self, maxJobs=1, executor=None):
+        self.maxJobs = maxJobs
+        self.executor = executor
+        if executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=maxJobs)
+        self._queue = None
+        self._runners = []
+
+    # -----------------------------------------------------------
+    # Parameters:   cipher (str): name of a cryptanalysis function without
+    #                   'cryptanalysis_' (e.g. 'affine', 'q4B', 'substitution'),
+    #                   or a function (see get_function)
+    #               ciphertext (str)
+    #               options (dict): keyword arguments of the function
+    #                   (e.g. workers, topK)
+    # Return:       job (Job)
+    # Errors:       if cipher is not a cryptanalysis function that accepts
+    #               the cancel and progress options:
+    #                   print('Error (submit): unknown cipher'), return None
+    # -----------------------------------------------------------
+    def submit(self, cipher, ciphertext, options=None):
+        function = get_function(cipher)
+        if function is None:
+            print('Error (submit): unknown cipher')
+            return None
+        options = dict(options) if options is not None else {}
+
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._runners = [loop.create_task(self._run_jobs()) for i in range(self.maxJobs)]
+        job = Job(function, ciphertext, options, loop.create_future())
+        self._queue.put_nowait(job)
+        return job
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       number of jobs waiting in the queue
+    # -----------------------------------------------------------
+    def get_queued(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       None
+    # Description:  Cancels every job, queued or running, waits for the
+    #               running ones to stop and shuts down the executor
+    # -----------------------------------------------------------
+    async def close(self):
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait().cancel()
+            for runner in self._runners:
+                runner.cancel()
+            await asyncio.gather(*self._runners, return_exceptions=True)
+            self._queue = None
+            self._runners = []
+        self.executor.shutdown(wait=True)
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       None
+    # Description:  Task that runs the queued jobs one after the other
+    #               (maxJobs of them run at the same time)
+    # -----------------------------------------------------------
+    async def _run_jobs(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            if job.status != 'queued':
+                continue
+            job.status = 'running'
+            job._started = time.monotonic()
+            call = functools.partial(job.function, job.ciphertext, cancel=job._cancel,
+                                     progress=job._add_tried, **job.options)
+            running = loop.run_in_executor(self.executor, call)
+            try:
+                await asyncio.wait([running])
+            except asyncio.CancelledError:
+                # close(): the search stops at its next batch
+                job._cancel.set()
+                await asyncio.wait([running])
+                self._end_job(job, running)
+                raise
+            self._end_job(job, running)
+
+    # -----------------------------------------------------------
+    # Parameters:   job (Job)
+    #               running (asyncio.Future): its finished function call
+    # Return:       None
+    # Description:  Gives the job its result (or exception) and status
+    # -----------------------------------------------------------
+    def _end_job(self, job, running):
+        job._ended = time.monotonic()
+        if running.exception() is not None:
+            job.status = 'failed'
+            job._future.set_exception(running.exception())
+            return
+        result = running.result()
+        job.status = 'cancelled' if getattr(result, 'status', '') == 'cancelled' else 'done'
+        job._future.set_result(result)
+        return
+
+# -----------------------------------------------------------
+# Parameters:   cipher (str): name of a cryptanalysis function of
+#                   cryptography_library or substitution without
+#                   'cryptanalysis_', or a function
+# Return:       function (callable) that takes (ciphertext, **options) and
+#               accepts the cancel and progress options of
+#               keysearch.KeySearch, None if there is none
+#               (e.g. cryptanalysis_xshift does not search with them)
+# -----------------------------------------------------------
+
+
+def get_function(cipher):
+    function = cipher
+    if not callable(cipher):
+        function = None
+        for module in _MODULES:
+            function = getattr(module, 'cryptanalysis_' + str(cipher), None)
+            if function is not None:
+                break
+        if function is None:
+            return None
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == p.VAR_KEYWORD for p in parameters):
+        return function
+    names = [p.name for p in parameters if p.kind != p.POSITIONAL_ONLY]
+    if all(option in names for option in _JOB_OPTIONS):
+        return function
+    return None
@@ -0,0 +1,632 @@
+import os
+import copy
+import time
+import heapq
+import pickle
+import hashlib
+import multiprocessing
+import concurrent.futures
+import utilities
+import distributed
+
+# 1- KeySpace (class)
+# 2- SearchResult (class)
+# 3- KeySearch (class)
+# 4- list_space(keys)
+
+# lowest chunk with a winning key, shared with the worker processes
+# (None when chunks run in the calling process)
+_stop = None
+
+# largest value of the shared stop marker: no chunk has won yet
+_NO_HIT = 2**62
+
+# -----------------------------------------------------------
+# Class:        KeySpace
+# Description:  Lazy description of the keys a cipher can have
+#               segments is a list of tuples of sequences (lists, ranges)
+#               The values of a segment are every combination of one item
+#               of each sequence, the last sequence changing fastest,
+#               and segments follow each other
+#               build(values) turns the values into a key, or returns
+#               None when they do not make a valid key
+#               Keys are numbered in this order, so the space can be split
+#               into ranges of numbers without listing it
+#               build must be a module level function (sent to workers)
+# -----------------------------------------------------------
+
+
+class KeySpace:
+
+    def __init__(self, segments, build):
+        self.segments = [tuple(segment) for segment in segments]
+        self.build = build
+        self.sizes = []
+        for segment in self.segments:
+            size = 1
+            for values in segment:
+                size *= len(values)
+            self.sizes.append(size)
+
+    def __len__(self):
+        return sum(self.sizes)
+
+    # -----------------------------------------------------------
+    # Parameters:   lo (int), hi (int): range of key numbers
+    # Return:       generator of (number, key) for the valid keys
+    # -----------------------------------------------------------
+    def keys(self, lo, hi):
+        start = 0
+        for s in range(len(self.segments)):
+            end = start + self.sizes[s]
+            for n in range(max(lo, start), min(hi, end)):
+                index = n - start
+                values = []
+                for sequence in reversed(self.segments[s]):
+                    index, i = divmod(index, len(sequence))
+                    values.append(sequence[i])
+                key = self.build(tuple(reversed(values)))
+                if key is not None:
+                    yield n, key
+            start = end
+
+# -----------------------------------------------------------
+# Class:        SearchResult
+# Description:  Tuple of the values a cryptanalysis function returns,
+#               usually (plaintext, key), so it unpacks like the return
+#               value of the older cryptanalysis functions
+#               Also has the attributes:
+#               status (str): 'found', 'not found', 'timed out' or 'cancelled'
+#               attempts (int): valid keys tried, up to the winning key
+#               fraction (float): part of the key space searched
+#               ranked (list): best keys of a topK search, best first,
+#                   as (ratio, key, plaintext); [] otherwise
+#               equivalent (list): keys of the space that decrypt the same
+#                   way as the key found, in key order, when the search
+#                   used canonical keys (see KeySearch); [] otherwise
+#               stats (dict): statistics of the cryptanalysis function,
+#                   e.g. the cache of its cascade.Cascade; {} otherwise
+# -----------------------------------------------------------
+
+
+class SearchResult(tuple):
+
+    def __new__(cls, values, status, attempts, fraction, ranked=None, equivalent=None,
+                stats=None):
+        result = tuple.__new__(cls, values)
+        result.status = status
+        result.attempts = attempts
+        result.fraction = fraction
+        result.ranked = ranked if ranked is not None else []
+        result.equivalent = equivalent if equivalent is not None else []
+        result.stats = stats if stats is not None else {}
+        return result
+
+    def __reduce__(self):
+        return (SearchResult, (tuple(self), self.status, self.attempts,
+                               self.fraction, self.ranked, self.equivalent, self.stats))
+
+# -----------------------------------------------------------
+# Class:        KeySearch
+# Description:  Brute-force search of a KeySpace
+#               decrypt(ciphertext, key) gives the candidate plaintext,
+#               transform(plaintext), if given, is what gets scored
+#               scorer is a dictionary or scorer function
+#               (see utilities.score_candidates), a key wins if its
+#               score is >= threshold
+#               A scorer with get_counts() and add_counts(counts) methods
+#               (e.g. pipeline.ScoringPipeline) keeps statistics: the counts
+#               of the copies scoring in worker processes are added to it
+#               The same goes for the object of a decrypt method (e.g.
+#               cascade.Cascade.decrypt)
+#               The space is split into chunks of consecutive keys
+#               With several workers, chunks run on a process pool and
+#               once a chunk finds a key, the chunks after it are cancelled
+#               and the running ones stop at their next batch
+#               distributed: if True, the workers are processes that get
+#                   their chunks over TCP on localhost instead of a process
+#                   pool (see distributed.Coordinator), same result
+#               The winner is always the first winning key in key order,
+#               so the result does not depend on the number of workers
+#               workers: processes to use, default is 1: everything runs
+#                   in the calling process, so scripts need no
+#                   if __name__ == '__main__' guard and a stateful scorer
+#                   keeps its state; more than 1 starts a process pool
+#                   (e.g. os.cpu_count())
+#               chunkSize: keys per chunk, default splits the space in
+#                   about 4 chunks per worker (at most 4096 keys each)
+#               batchSize: keys decrypted and scored together
+#               topK: if > 0, the whole space is searched and the topK best
+#                   scoring keys are kept (each chunk keeps a heap of its
+#                   topK best, the heaps are merged at the end)
+#                   The result is the best key, found if its score is
+#                   >= threshold, and result.ranked lists all topK keys
+#                   Equal scores are ranked in key order
+#               checkpoint: file name, if given the search saves its
+#                   progress there every checkpointInterval seconds:
+#                   the first key not searched yet, the attempts so far
+#                   and the topK best so far
+#                   A search started with a checkpoint of the same search
+#                   (same ciphertext, keys in the same order, decrypt,
+#                   transform, scorer, canonical, threshold and topK)
+#                   continues from it, and gives the same result as a
+#                   search that was never stopped
+#                   The file is deleted when the search ends, and kept
+#                   when it times out or is cancelled
+#               timeout: seconds the search may take, None for no limit
+#               cancel: object with an is_set() method, e.g.
+#                   threading.Event, the search stops once it is set
+#               timeout and cancel are checked between batches; a search
+#               stopped by them returns the best key scored so far with
+#               status 'timed out' or 'cancelled', and result.fraction
+#               tells how much of the space was searched
+#               canonical: function giving the same value (hashable) for
+#                   keys that decrypt the same way, e.g. the key order of a
+#                   transposition key; if given, the keys are grouped by it
+#                   first and only the first key of each group (in key
+#                   order) is decrypted, attempts and fraction count these
+#                   keys, and result.equivalent lists the group of the key
+#                   found (the space is listed, so it must fit in memory)
+#               progress: function called with the number of keys just
+#                   scored, after each batch (or each chunk of a worker)
+#                   It runs in the calling process (in a thread of its own
+#                   for distributed searches)
+# -----------------------------------------------------------
+
+
+class KeySearch:
+
+    def __init__(self, space, decrypt, scorer, threshold, transform=None,
+                 workers=1, chunkSize=None, batchSize=64, topK=0,
+                 checkpoint='', checkpointInterval=5, timeout=None, cancel=None,
+                 distributed=False, progress=None, canonical=None):
+        self.space = space
+        self.decrypt = decrypt
+        self.scorer = scorer
+        self.threshold = threshold
+        self.transform = transform
+        self.workers = workers
+        self.chunkSize = chunkSize
+        self.batchSize = batchSize
+        self.topK = topK
+        self.checkpoint = checkpoint
+        self.checkpointInterval = checkpointInterval
+        self.timeout = timeout
+        self.cancel = cancel
+        self.distributed = distributed
+        self.progress = progress
+        self.canonical = canonical
+        self._deadline = None
+
+    # workers are stopped through _stop, cancel (e.g. a threading.Event)
+    # and progress stay in the calling process
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['cancel'] = None
+        state['progress'] = None
+        return state
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    # Return:       result (SearchResult)
+    # Description:  Searches the space for the first winning key
+    #               (or the topK best keys)
+    # -----------------------------------------------------------
+    def run(self, ciphertext):
+        if self.canonical is not None:
+            return self._run_canonical(ciphertext)
+        if self.distributed:
+            return distributed.run_distributed(self, ciphertext)
+        size = len(self.space)
+        if self.timeout is not None:
+            self._deadline = time.monotonic() + self.timeout
+        state = self._load_checkpoint(ciphertext, size)
+        chunks = self._get_chunks(state['cursor'], size)
+        self._saved = time.monotonic()
+        if self.workers <= 1 or len(chunks) <= 1:
+            winner, partial = self._run_serial(ciphertext, chunks, state)
+        else:
+            winner, partial = self._run_parallel(ciphertext, chunks, state)
+        return self._get_result(ciphertext, state, winner, partial)
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    # Return:       result (SearchResult)
+    # Description:  Search of the first key of each canonical key group
+    # -----------------------------------------------------------
+    def _run_canonical(self, ciphertext):
+        groups = {}
+        for n, key in self.space.keys(0, len(self.space)):
+            groups.setdefault(self.canonical(key), []).append(key)
+        search = copy.copy(self)
+        # copy goes through __getstate__, which leaves out cancel and progress
+        search.cancel = self.cancel
+        search.progress = self.progress
+        search.canonical = None
+        search.space = list_space([keys[0] for keys in groups.values()])
+        result = search.run(ciphertext)
+        equivalent = []
+        if result.status == 'found' or result.ranked != []:
+            key = result.ranked[0][1] if result.ranked != [] else result[1]
+            equivalent = groups[self.canonical(key)]
+        return SearchResult(tuple(result), result.status, result.attempts, result.fraction,
+                            result.ranked, equivalent)
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    #               state (dict): progress of the chunks done in key order
+    #               winner, partial: see _run_serial
+    # Return:       result (SearchResult)
+    # Description:  Ends a search: saves or deletes the checkpoint and
+    #               builds the result
+    # -----------------------------------------------------------
+    def _get_result(self, ciphertext, state, winner, partial):
+        size = len(self.space)
+        if partial is not None:
+            if self.checkpoint != '':
+                self._save_checkpoint(ciphertext, state)
+            return self._get_partial(state, partial, size)
+        if self.checkpoint != '' and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+        if self.topK > 0:
+            ranked = self._get_ranked(state['top'])
+            fraction = 1 if size > 0 else 0
+            if ranked != [] and ranked[0][0] >= self.threshold:
+                return SearchResult((ranked[0][2], ranked[0][1]), 'found', state['attempts'],
+                                    fraction, ranked)
+            return SearchResult(('', ''), 'not found', state['attempts'], fraction, ranked)
+        if winner is not None:
+            return SearchResult((winner['plaintext'], winner['key']), 'found',
+                                state['attempts'] + winner['tried'], (winner['n'] + 1) / size)
+        return SearchResult(('', ''), 'not found', state['attempts'], 1 if size > 0 else 0)
+
+    # -----------------------------------------------------------
+    # Parameters:   state (dict): progress of the chunks done in key order
+    #               partial (list): search_chunk results of the other
+    #                   chunks that ran (some of them only in part)
+    #               size (int): number of keys in the space
+    # Return:       result (SearchResult)
+    # Description:  Result of a search stopped by its timeout or cancel:
+    #               the best key scored so far (or '','' if none)
+    # -----------------------------------------------------------
+    def _get_partial(self, state, partial, size):
+        status = 'cancelled' if self.cancel is not None and self.cancel.is_set() else 'timed out'
+        attempts = state['attempts'] + sum(outcome['tried'] for outcome in partial)
+        searched = state['cursor'] + sum(outcome['reached'] for outcome in partial)
+        top = state['top'] + [item for outcome in partial for item in outcome['top']]
+        ranked = self._get_ranked(top)
+        values = (ranked[0][2], ranked[0][1]) if ranked != [] else ('', '')
+        return SearchResult(values, status, attempts, searched / size if size > 0 else 0,
+                            ranked if self.topK > 0 else [])
+
+    # -----------------------------------------------------------
+    # Parameters:   top (list): heap items (ratio, -number, key, plaintext)
+    # Return:       ranked (list): best (ratio, key, plaintext), best first
+    # -----------------------------------------------------------
+    def _get_ranked(self, top):
+        return [(ratio, key, plaintext) for ratio, n, key, plaintext in
+                heapq.nlargest(max(self.topK, 1), top)]
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       True if the timeout passed or cancel is set
+    # -----------------------------------------------------------
+    def _is_interrupted(self):
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            return True
+        return self.cancel is not None and self.cancel.is_set()
+
+    # -----------------------------------------------------------
+    # Parameters:   start (int): first key number to search
+    #               size (int): number of keys in the space
+    # Return:       chunks (list of (lo, hi))
+    # -----------------------------------------------------------
+    def _get_chunks(self, start, size):
+        chunkSize = self.chunkSize
+        if chunkSize is None:
+            chunkSize = min(4096, max(1, -(-(size - start) // (4 * self.workers))))
+        return [(lo, min(lo + chunkSize, size)) for lo in range(start, size, chunkSize)]
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    #               chunks (list)
+    #               state (dict): cursor, attempts and top, updated
+    # Return:       winner: search_chunk result of the winning chunk or None
+    #               partial: list of unfinished search_chunk results if
+    #                   the search was interrupted, None otherwise
+    # -----------------------------------------------------------
+    def _run_serial(self, ciphertext, chunks, state):
+        for c in range(len(chunks)):
+            if self._is_interrupted():
+                return None, []
+            outcome = self.search_chunk(ciphertext, c, chunks[c])
+            if outcome['status'] == 'stopped':
+                return None, [outcome]
+            if outcome['status'] == 'found' and self.topK == 0:
+                return outcome, None
+            self._advance(ciphertext, state, chunks[c], outcome)
+        return None, None
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    #               chunks (list)
+    #               state (dict): cursor, attempts and top, updated
+    # Return:       winner, partial (see _run_serial)
+    # Description:  Runs the chunks on a process pool
+    #               Finished chunks are added to state in key order, so
+    #               every chunk before the winning one is counted
+    #               The timeout and cancel are checked while waiting;
+    #               once interrupted, every chunk stops at its next batch
+    # -----------------------------------------------------------
+    def _run_parallel(self, ciphertext, chunks, state):
+        stop = multiprocessing.Value('q', _NO_HIT)
+        outcomes = [None] * len(chunks)
+        done = 0
+        winner = None
+        interrupted = False
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(stop,))
+        futures = {}
+        try:
+            for c in range(len(chunks)):
+                futures[pool.submit(_search_chunk, self, ciphertext, c, chunks[c])] = c
+            pending = set(futures)
+            while pending != set() and winner is None:
+                finished, pending = concurrent.futures.wait(
+                    pending, timeout=0.05, return_when=concurrent.futures.FIRST_COMPLETED)
+                if not interrupted and self._is_interrupted():
+                    interrupted = True
+                    with stop.get_lock():
+                        stop.value = -1
+                    for future in pending:
+                        future.cancel()
+                for future in finished:
+                    if future.cancelled():
+                        continue
+                    c = futures[future]
+                    outcomes[c] = future.result()
+                    self._add_counts(outcomes[c])
+                    if self.progress is not None:
+                        self.progress(outcomes[c]['tried'])
+                    if outcomes[c]['status'] == 'found' and self.topK == 0 and c < stop.value:
+                        with stop.get_lock():
+                            stop.value = min(stop.value, c)
+                        for other in futures:
+                            if futures[other] > c:
+                                other.cancel()
+                while done < len(chunks) and outcomes[done] is not None:
+                    if outcomes[done]['status'] == 'stopped':
+                        break
+                    if outcomes[done]['status'] == 'found' and self.topK == 0:
+                        winner = outcomes[done]
+                        break
+                    self._advance(ciphertext, state, chunks[done], outcomes[done])
+                    done += 1
+                pending = {future for future in pending if not future.cancelled()}
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        # chunks still running when the search ended scored keys too
+        for future in futures:
+            if outcomes[futures[future]] is None and not future.cancelled():
+                if future.exception() is None:
+                    self._add_counts(future.result())
+
+        if winner is not None or not interrupted:
+            return winner, None
+        return None, [outcome for outcome in outcomes[done:] if outcome is not None]
+
+    # -----------------------------------------------------------
+    # Parameters:   outcome: search_chunk result of a worker process
+    # Return:       None
+    # Description:  Adds the counts of the worker to the scorer and
+    #               decrypt objects that keep counts (see _get_counters)
+    # -----------------------------------------------------------
+    def _add_counts(self, outcome):
+        if 'counts' in outcome:
+            for counter, counts in zip(_get_counters(self), outcome['counts']):
+                counter.add_counts(counts)
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    #               state (dict)
+    #               chunk (lo, hi): the next chunk in key order
+    #               outcome: its search_chunk result
+    # Return:       None
+    # Description:  Adds a finished chunk to the state of the search
+    #               and saves a checkpoint if one is due
+    # -----------------------------------------------------------
+    def _advance(self, ciphertext, state, chunk, outcome):
+        state['cursor'] = chunk[1]
+        state['attempts'] += outcome['tried']
+        state['top'] = heapq.nlargest(max(self.topK, 1), state['top'] + outcome['top'])
+        if self.checkpoint != '' and time.monotonic() - self._saved >= self.checkpointInterval:
+            self._save_checkpoint(ciphertext, state)
+            self._saved = time.monotonic()
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    # Return:       tag (tuple)
+    # Description:  Identifies a search, so a checkpoint is only used
+    #               to continue the same search
+    #               The key order is part of the tag (a key number means
+    #               another key in a space sorted another way, e.g. best-first)
+    # -----------------------------------------------------------
+    def _get_tag(self, ciphertext):
+        segments = repr(self.space.segments).encode('utf8')
+        return (hashlib.sha1(ciphertext.encode('utf8')).hexdigest(),
+                len(self.space), hashlib.sha1(segments).hexdigest(),
+                _describe(self.space.build), _describe(self.decrypt),
+                _describe(self.transform), _describe(self.scorer),
+                _describe(self.canonical), self.threshold, self.topK)
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    #               state (dict)
+    # Return:       None
+    # Description:  Writes the checkpoint file (temporary file + rename,
+    #               so a killed process never leaves half a checkpoint)
+    # -----------------------------------------------------------
+    def _save_checkpoint(self, ciphertext, state):
+        tempFile = self.checkpoint + '.tmp' + str(os.getpid())
+        outFile = open(tempFile, 'wb')
+        pickle.dump((self._get_tag(ciphertext), state), outFile)
+        outFile.close()
+        os.replace(tempFile, self.checkpoint)
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    #               size (int): number of keys in the space
+    # Return:       state (dict): cursor, attempts, top
+    # Description:  State saved in the checkpoint file if it belongs to
+    #               this search, otherwise the state of a new search
+    # -----------------------------------------------------------
+    def _load_checkpoint(self, ciphertext, size):
+        if self.checkpoint != '' and os.path.exists(self.checkpoint):
+            inFile = open(self.checkpoint, 'rb')
+            tag, state = pickle.load(inFile)
+            inFile.close()
+            if tag == self._get_tag(ciphertext) and 0 <= state['cursor'] <= size:
+                return state
+        return {'cursor': 0, 'attempts': 0, 'top': []}
+
+    # -----------------------------------------------------------
+    # Parameters:   ciphertext (str)
+    #               c (int): chunk number
+    #               chunk (lo, hi)
+    # Return:       outcome (dict):
+    #               status: 'found', 'not found', or 'stopped' if an earlier
+    #                   chunk already won or the search was interrupted
+    #               tried: valid keys scored (up to the winner if found)
+    #               reached: key numbers covered, counted from lo
+    #               top: heap of the best max(topK, 1) keys scored as
+    #                   (ratio, -number, key, plaintext)
+    #               n, key, plaintext: the winner if found
+    # Description:  Decrypts and scores the valid keys of one chunk, in
+    #               batches, until one of them wins (or all of them for topK)
+    # -----------------------------------------------------------
+    def search_chunk(self, ciphertext, c, chunk):
+        keep = max(self.topK, 1)
+        outcome = {'status': 'not found', 'tried': 0, 'reached': 0, 'top': []}
+        top = outcome['top']
+        keys = self.space.keys(chunk[0], chunk[1])
+        while True:
+            if (_stop.value < c) if _stop is not None else self._is_interrupted():
+                outcome['status'] = 'stopped'
+                return outcome
+            batch = [item for _, item in zip(range(self.batchSize), keys)]
+            if batch == []:
+                outcome['reached'] = chunk[1] - chunk[0]
+                return outcome
+            plaintexts = [self.decrypt(ciphertext, key) for n, key in batch]
+            texts = plaintexts
+            if self.transform is not None:
+                texts = [self.transform(p) for p in plaintexts]
+            # a topK search ranks every key, otherwise the first winner is enough
+            ratios, index = utilities.score_candidates(texts, self.scorer, self.threshold,
+                                                       self.topK > 0)
+            if self.topK > 0 or index == -1:
+                index = len(batch) - 1
+            for i in range(index + 1):
+                # -number ranks equal ratios in key order
+                item = (ratios[i], -batch[i][0], batch[i][1], plaintexts[i])
+                if len(top) < keep:
+                    heapq.heappush(top, item)
+                elif item[:2] > top[0][:2]:
+                    heapq.heapreplace(top, item)
+            outcome['tried'] += index + 1
+            if self.progress is not None:
+                self.progress(index + 1)
+            outcome['reached'] = batch[index][0] + 1 - chunk[0]
+            if self.topK == 0 and ratios[index] >= self.threshold:
+                outcome.update(status='found', n=batch[index][0], key=batch[index][1],
+                               plaintext=plaintexts[index])
+                return outcome
+
+# -----------------------------------------------------------
+# Parameters:   stop (multiprocessing.Value)
+# Return:       None
+# Description:  Runs once in every worker process of KeySearch
+# -----------------------------------------------------------
+
+
+def _init_worker(stop):
+    global _stop
+    _stop = stop
+    return
+
+# -----------------------------------------------------------
+# Parameters:   search (KeySearch), ciphertext, c, chunk
+# Return:       see KeySearch.search_chunk
+#               counts: what the chunk added to the counts of each object
+#                   of _get_counters(search) (see KeySearch._add_counts)
+# Description:  Module level entry point of a worker process
+# -----------------------------------------------------------
+
+
+def _search_chunk(search, ciphertext, c, chunk):
+    counters = _get_counters(search)
+    if counters == []:
+        return search.search_chunk(ciphertext, c, chunk)
+    before = [counter.get_counts() for counter in counters]
+    outcome = search.search_chunk(ciphertext, c, chunk)
+    outcome['counts'] = [[a - b for a, b in zip(counters[i].get_counts(), before[i])]
+                         for i in range(len(counters))]
+    return outcome
+
+# -----------------------------------------------------------
+# Parameters:   search (KeySearch)
+# Return:       counters (list): the scorer and the object of the decrypt
+#               method, if they have get_counts and add_counts
+# -----------------------------------------------------------
+
+
+def _get_counters(search):
+    counters = []
+    for counter in (search.scorer, getattr(search.decrypt, '__self__', None)):
+        if hasattr(counter, 'get_counts') and hasattr(counter, 'add_counts'):
+            counters.append(counter)
+    return counters
+
+# -----------------------------------------------------------
+# Parameters:   value: function, dictionary or scorer of a search
+# Return:       description (str) of value for the checkpoint tag
+# Description:  Functions by name, dictionaries loaded from a file by
+#               their path, other objects by their type
+# -----------------------------------------------------------
+
+
+def _describe(value):
+    if value is None or isinstance(value, str):
+        return repr(value)
+    name = getattr(value, '__qualname__', None)
+    if isinstance(name, str):
+        return getattr(value, '__module__', '') + '.' + name
+    path = getattr(value, 'path', '')
+    if isinstance(path, str) and path != '':
+        return type(value).__qualname__ + ' ' + repr(os.path.abspath(path))
+    return type(value).__module__ + '.' + type(value).__qualname__
+
+# -----------------------------------------------------------
+# Parameters:   keys (list)
+# Return:       space (KeySpace)
+# Description:  Key space made of a given list of keys, searched in
+#               the order of the list (e.g. keys sorted best-first)
+# -----------------------------------------------------------
+
+
+def list_space(keys):
+    return KeySpace([(keys,)], _get_first)
+
+# -----------------------------------------------------------
+# Parameters:   values (tuple)
+# Return:       values[0]
+# Description:  build function of list_space
+# -----------------------------------------------------------
+
+
+def _get_first(values):
+    return values[0]
@@ -453,6 +453,55 @@ def mul_inv_table(m):
     table.append(mul_inv_lst)
     return table
 
+#-----------------------------------------------------------
+# Parameters:   n (a positive integer)
+# Return:       phi(n) (int)
+# Description:  Euler's totient: count of numbers in [1,n]
+#               relatively prime to n, from the prime factors of n
+#               phi(n) = n * product of (1 - 1/p) for each prime p | n
+# Example:      totient(10) --> 4
+# Errors:       n should be positive integer
+#                   return 'Error (totient): Invalid input'
+#-----------------------------------------------------------
+def totient(n):
+    if not isinstance(n, int) or n <= 0:
+        return 'Error (totient): Invalid input'
+
+    phi = n
+    p = 2
+    while p * p <= n:
+        if n % p == 0:
+            while n % p == 0:
+                n //= p
+            phi -= phi // p
+        p += 1 if p == 2 else 2
+    if n > 1:
+        phi -= phi // n
+    return phi
+
+#-----------------------------------------------------------
+# Parameters:   a (an integer)
+#               b (an integer)
+#               m (a positive integer)
+# Return:       solutions (list)
+# Description:  Returns all x in [0,m) such that a*x = b mod m
+#               With d = gcd(a,m): no solution if d does not divide b,
+#               otherwise d solutions, m/d apart
+# Example:      linear_congruence(4,2,6) --> [2,5]
+# Errors:       m should be positive integer
+#                   return 'Error (linear_congruence): Invalid mod'
+#-----------------------------------------------------------
+def linear_congruence(a,b,m):
+    if not isinstance(m, int) or m <= 0:
+        return 'Error (linear_congruence): Invalid mod'
+
+    d = math.gcd(a % m, m)
+    if b % d != 0:
+        return []
+    step = m // d
+    x = (b // d) * pow(a // d, -1, step) % step if step > 1 else 0
+    return [x + k * step for k in range(d)]
+
 # ----- Testing Function -------------
 # you may use this function to test your solution locally
 def test_mod():
@@ -0,0 +1,145 @@
+import functools
+import utilities
+
+# 1- get_letterChiSquared(text)
+# 2- get_wordRatio(text, dictList)
+# 3- ScoringPipeline (class)
+# 4- default_pipeline(dictList, threshold)
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+# Return:       double
+# Description:  Chi-squared statistics of the letters of a text against
+#               utilities.get_freqTable, divided by the number of letters
+#               so one threshold fits texts of any length
+#               English is usually below 1, wrong decryptions above 5
+#               Unlike utilities.get_chiSquared, expected counts are based
+#               on the number of letters only (not spaces or punctuation)
+#               A text without letters --> 0
+# -----------------------------------------------------------
+
+
+def get_letterChiSquared(text):
+    freqTable = utilities.get_freqTable()
+    charCount = utilities.get_charCount(text)
+    n = sum(charCount)
+    if n == 0:
+        return 0
+    result = 0
+    for i in range(26):
+        Ei = freqTable[i] * n
+        result += ((charCount[i] - Ei) ** 2) / Ei
+    return result / n
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+#               dictList (Dictionary, list of lists or filename)
+# Return:       ratio (float)
+# Description:  #matches/#words of a text (see utilities.analyze_text)
+#               A text without words --> 0
+# -----------------------------------------------------------
+
+
+def get_wordRatio(text, dictList):
+    matches, mismatches = utilities.analyze_text(text, dictList)
+    if matches + mismatches == 0:
+        return 0
+    return matches / (matches + mismatches)
+
+# -----------------------------------------------------------
+# Class:        ScoringPipeline
+# Description:  Chain of scoring stages, cheapest first
+#               Each stage is [name, function, threshold, higherIsBetter]
+#               function(text) returns a number, the stage passes if it is
+#               >= threshold (higherIsBetter) or <= threshold (otherwise)
+#               A text is rejected by the first stage it fails, so later
+#               (expensive) stages only see texts that passed all earlier ones
+#               Calling the pipeline on a text returns the value of the last
+#               stage if every stage passed, 0 otherwise, so it can be used
+#               as a scorer wherever a dictionary is expected
+#               (utilities.is_plaintext, score_candidates, cryptanalysis_*)
+#               passed[i]/failed[i] count the texts each stage accepted/rejected
+#               When a keysearch.KeySearch scores with workers, the counts
+#               of the workers are added to the pipeline of the calling
+#               process (see get_counts and add_counts)
+# -----------------------------------------------------------
+
+
+class ScoringPipeline:
+
+    def __init__(self, stages):
+        self.stages = [list(stage) for stage in stages]
+        self.passed = [0] * len(self.stages)
+        self.failed = [0] * len(self.stages)
+
+    def __call__(self, text):
+        value = 0
+        for i in range(len(self.stages)):
+            name, function, threshold, higherIsBetter = self.stages[i]
+            value = function(text)
+            if (value >= threshold) if higherIsBetter else (value <= threshold):
+                self.passed[i] += 1
+            else:
+                self.failed[i] += 1
+                return 0
+        return value
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       None
+    # Description:  Sets all pass/fail counters to 0
+    # -----------------------------------------------------------
+    def reset(self):
+        self.passed = [0] * len(self.stages)
+        self.failed = [0] * len(self.stages)
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       counts (list): passed counters, then failed counters
+    # -----------------------------------------------------------
+    def get_counts(self):
+        return self.passed + self.failed
+
+    # -----------------------------------------------------------
+    # Parameters:   counts (list): as returned by get_counts
+    # Return:       None
+    # Description:  Adds counts (e.g. of a copy of the pipeline in a
+    #               worker process) to the pass/fail counters
+    # -----------------------------------------------------------
+    def add_counts(self, counts):
+        n = len(self.stages)
+        for i in range(n):
+            self.passed[i] += counts[i]
+            self.failed[i] += counts[n + i]
+        return
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       None
+    # Description:  Prints the pass/fail counters of every stage
+    # -----------------------------------------------------------
+    def print_stats(self):
+        for i in range(len(self.stages)):
+            print('{}: passed = {}, failed = {}'.format(
+                self.stages[i][0], self.passed[i], self.failed[i]))
+        return
+
+# -----------------------------------------------------------
+# Parameters:   dictList (Dictionary, list of lists or filename)
+#               threshold (float): #matches/#words needed, between 0 and 1
+# Return:       pipeline (ScoringPipeline)
+# Description:  Chi-squared per letter <= 3
+#               --> dictionary word ratio >= threshold
+#               Wrong keys of a substitution (shift, affine...) give letters
+#               English frequencies do not fit, so most of them never reach
+#               the dictionary; transposition keys do not change letter
+#               frequencies, so for transposition ciphers only the
+#               dictionary stage rejects keys
+# -----------------------------------------------------------
+
+
+def default_pipeline(dictList='engmix.txt', threshold=0.9):
+    return ScoringPipeline([
+        ['chi-squared', get_letterChiSquared, 3, False],
+        ['dictionary', functools.partial(get_wordRatio, dictList=dictList), threshold, True]])
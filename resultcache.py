@@ -0,0 +1,232 @@
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import inspect
+import functools
+
+# 1- ResultCache (class)
+# 2- set_default(cache)
+# 3- cached(cipher)
+
+# options that change how long a search takes, not its result
+_RUN_OPTIONS = ('workers', 'chunkSize', 'batchSize', 'checkpoint', 'checkpointInterval',
+                'timeout', 'cancel', 'progress', 'distributed')
+
+# cache used when a cryptanalysis function is not given one (None: no cache)
+_default = None
+
+# -----------------------------------------------------------
+# Class:        ResultCache
+# Description:  SQLite file of cryptanalysis results, keyed by
+#               (cipher type, sha1 of the ciphertext, search options)
+#               maxEntries: results kept, the least recently used ones
+#                   are deleted first
+#               Results are stored pickled, so the file must only come
+#               from a trusted source
+#               Every call opens its own connection, so a cache can be
+#               shared by threads and processes
+# -----------------------------------------------------------
+
+
+class ResultCache:
+
+    def __init__(self, fileName='results.sqlite', maxEntries=10000):
+        self.fileName = fileName
+        self.maxEntries = maxEntries
+        connection = self._connect()
+        with connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS results (cipher TEXT, textHash TEXT, '
+                               'options TEXT, result BLOB, used REAL, '
+                               'PRIMARY KEY (cipher, textHash, options))')
+        connection.close()
+
+    # -----------------------------------------------------------
+    # Parameters:   cipher (str), ciphertext (str), options (str)
+    # Return:       the stored result, None if there is none
+    # -----------------------------------------------------------
+    def get(self, cipher, ciphertext, options):
+        key = (cipher, _get_hash(ciphertext), options)
+        connection = self._connect()
+        with connection:
+            row = connection.execute('SELECT result FROM results WHERE cipher = ? AND '
+                                     'textHash = ? AND options = ?', key).fetchone()
+            if row is not None:
+                connection.execute('UPDATE results SET used = ? WHERE cipher = ? AND '
+                                   'textHash = ? AND options = ?', (time.time(),) + key)
+        connection.close()
+        return pickle.loads(row[0]) if row is not None else None
+
+    # -----------------------------------------------------------
+    # Parameters:   cipher (str), ciphertext (str), options (str)
+    #               result: value to store
+    # Return:       None
+    # Description:  Stores a result, then deletes the least recently used
+    #               ones beyond maxEntries
+    # -----------------------------------------------------------
+    def put(self, cipher, ciphertext, options, result):
+        key = (cipher, _get_hash(ciphertext), options)
+        connection = self._connect()
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                               key + (pickle.dumps(result), time.time()))
+            connection.execute('DELETE FROM results WHERE rowid NOT IN (SELECT rowid FROM '
+                               'results ORDER BY used DESC LIMIT ?)', (self.maxEntries,))
+        connection.close()
+        return
+
+    def __len__(self):
+        connection = self._connect()
+        count = connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        connection.close()
+        return count
+
+    # -----------------------------------------------------------
+    # Parameters:   None
+    # Return:       None
+    # Description:  Deletes every result
+    # -----------------------------------------------------------
+    def clear(self):
+        connection = self._connect()
+        with connection:
+            connection.execute('DELETE FROM results')
+        connection.close()
+        return
+
+    def _connect(self):
+        return sqlite3.connect(self.fileName, timeout=30)
+
+# -----------------------------------------------------------
+# Parameters:   cache (ResultCache, file name or None)
+# Return:       None
+# Description:  Cache used by the cryptanalysis functions that are not
+#               given a cache option; None turns it off (default)
+# -----------------------------------------------------------
+
+
+def set_default(cache):
+    global _default
+    _default = ResultCache(cache) if isinstance(cache, str) else cache
+    return
+
+# -----------------------------------------------------------
+# Parameters:   cipher (str): cipher type, part of the cache key
+# Return:       decorator of a cryptanalysis function
+# Description:  The decorated function takes one more option, cache
+#               (ResultCache or file name, default is set by set_default)
+#               With a cache, a result stored for the same cipher,
+#               ciphertext and options is returned without searching, and
+#               the result of a successful search is stored
+#               A search is successful if its result has status 'found'
+#               (or no status and is not None)
+#               Options that only change how the search runs (workers,
+#               timeout, checkpoint...) are not part of the key; options
+#               that name a file (e.g. a dictionary file) are described by
+#               its absolute path and modification time; if an
+#               option has no stable description (e.g. a word list given
+#               as a list), the cache is not used
+# -----------------------------------------------------------
+
+
+def cached(cipher):
+    def decorate(function):
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            cache = kwargs.pop('cache', None)
+            if cache is None:
+                cache = _default
+            elif isinstance(cache, str):
+                cache = ResultCache(cache)
+            if cache is None:
+                return function(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            ciphertext, options = _get_key(signature, arguments.arguments)
+            if options is None:
+                return function(*args, **kwargs)
+
+            result = cache.get(cipher, ciphertext, options)
+            if result is not None:
+                return result
+            result = function(*args, **kwargs)
+            if result is not None and getattr(result, 'status', 'found') == 'found':
+                cache.put(cipher, ciphertext, options, result)
+            return result
+        return wrapper
+    return decorate
+
+# -----------------------------------------------------------
+# Parameters:   signature (inspect.Signature): of the cryptanalysis function
+#               arguments (dict): bound arguments of a call
+# Return:       ciphertext (str)
+#               options (str): description of the other arguments, None
+#                   if one of them has no stable description
+# -----------------------------------------------------------
+
+
+def _get_key(signature, arguments):
+    names = list(arguments)
+    ciphertext = arguments[names[0]]
+    values = []
+    for name in names[1:]:
+        value = arguments[name]
+        if signature.parameters[name].kind == inspect.Parameter.VAR_KEYWORD:
+            items = [(option, value[option]) for option in sorted(value)]
+        else:
+            items = [(name, value)]
+        for option, item in items:
+            if option in _RUN_OPTIONS:
+                continue
+            description = _describe(item)
+            if description is None:
+                return ciphertext, None
+            values.append(option + '=' + description)
+    return ciphertext, ', '.join(values)
+
+# -----------------------------------------------------------
+# Parameters:   value: an argument of a cryptanalysis function
+# Return:       description (str) that only depends on what value is
+#               (not where it is in memory), None if there is none
+# -----------------------------------------------------------
+
+
+def _describe(value):
+    if isinstance(value, str) and os.path.isfile(value):
+        return _describe_file(value)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return repr(value)
+    if isinstance(value, (tuple, list)) and len(value) <= 16:
+        items = [_describe(item) for item in value]
+        return None if None in items else '(' + ', '.join(items) + ')'
+    path = getattr(value, 'path', '')
+    if isinstance(path, str) and path != '' and os.path.isfile(path):
+        # dictionary loaded from a file
+        return _describe_file(path)
+    if inspect.isfunction(value) or inspect.isbuiltin(value):
+        # module level functions only (not lambdas or nested functions)
+        if '<' not in value.__qualname__:
+            return value.__module__ + '.' + value.__qualname__
+    return None
+
+# -----------------------------------------------------------
+# Parameters:   path (str): name of a file
+# Return:       description (str): absolute path and modification time,
+#               so a result is not reused once the file changes
+# -----------------------------------------------------------
+
+
+def _describe_file(path):
+    path = os.path.abspath(path)
+    return 'file ' + repr(path) + ' ' + repr(os.path.getmtime(path))
+
+# -----------------------------------------------------------
+# Parameters:   text (str)
+# Return:       sha1 of text (str)
+# -----------------------------------------------------------
+
+
+def _get_hash(text):
+    return hashlib.sha1(text.encode('utf8')).hexdigest()
@@ -0,0 +1,160 @@
+import os
+import re
+import math
+import dictionary
+
+# 1- load_trie(dictFile, corpusFile)
+# 2- text_to_letters(text)
+# 3- segment(text, dictFile, corpusFile)
+# 4- get_ratio(text, dictFile, corpusFile)
+# 5- is_plaintext(text, threshold, dictFile, corpusFile)
+
+# tries built so far, keyed by (dictFile, corpusFile, modification times)
+_cache = {}
+
+# -----------------------------------------------------------
+# Parameters:   dictFile (string): word list, one word per line
+#               corpusFile (string): English text used for word frequencies
+# Return:       (trie, floor, englishScore)
+#               trie (dict): nested dictionaries, one level per letter,
+#                   key '' of a node holds the log10 probability of the word
+#                   ending there
+#               floor (float): per letter score of a text split into
+#                   rare one-letter words
+#               englishScore (float): per letter score of the corpus
+# Description:  Builds the word trie used by segment, once per process
+#               Words of the corpus get log10(count/N) (N words in corpus)
+#               Other dictionary words are rare: log10(1/(10*N))
+#               Only words made of the letters a-z are kept
+# -----------------------------------------------------------
+
+
+def load_trie(dictFile='engmix.txt', corpusFile='corpus.txt'):
+    key = (os.path.abspath(dictFile), os.path.getmtime(dictFile),
+           os.path.abspath(corpusFile), os.path.getmtime(corpusFile))
+    if key in _cache:
+        return _cache[key]
+
+    inFile = open(corpusFile, 'r', encoding='utf8')
+    corpusWords = re.findall('[a-z]+', inFile.read().lower())
+    inFile.close()
+    counts = {}
+    for w in corpusWords:
+        counts[w] = counts.get(w, 0) + 1
+    total = max(len(corpusWords), 1)
+    rare = math.log10(1 / (10 * total))
+
+    trie = {}
+    for w in list(dictionary.load_dictionary(dictFile)) + list(counts):
+        if re.fullmatch('[a-z]+', w) is None:
+            continue
+        node = trie
+        for c in w:
+            node = node.setdefault(c, {})
+        node[''] = math.log10(counts[w] / total) if w in counts else rare
+
+    letters = sum(len(w) * c for w, c in counts.items())
+    englishScore = sum(math.log10(c / total) * c for c in counts.values()) / max(letters, 1)
+    _cache[key] = (trie, rare, englishScore)
+    return _cache[key]
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+# Return:       letters (string)
+# Description:  Lower case letters a-z of a text, everything else removed
+# -----------------------------------------------------------
+
+
+def text_to_letters(text):
+    return re.sub('[^a-z]', '', text.lower())
+
+# -----------------------------------------------------------
+# Parameters:   text (string): may have no spaces between words
+#               dictFile (string)
+#               corpusFile (string)
+# Return:       (words, coverage, score)
+#               words (list): most likely split of the letters of the text
+#               coverage (float): fraction of letters inside dictionary words
+#               score (float): log10 probability of the split per letter
+# Description:  Splits a text into dictionary words by dynamic programming
+#               best[i] is the best split of letters[i:], computed once for
+#               every i from the end: each step follows the trie from i,
+#               so only prefixes of real words are ever looked at
+#               A letter that starts no word is skipped at a penalty
+#               Runs in roughly linear time in the length of the text
+#               A text without letters --> ([], 0, 0)
+# -----------------------------------------------------------
+
+
+def segment(text, dictFile='engmix.txt', corpusFile='corpus.txt'):
+    trie, rare, englishScore = load_trie(dictFile, corpusFile)
+    letters = text_to_letters(text)
+    n = len(letters)
+    if n == 0:
+        return [], 0, 0
+    unknown = rare - 1
+
+    # best[i] = (score, covered letters, end of first word) of letters[i:]
+    best = [(0.0, 0, n)] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        choice = (best[i + 1][0] + unknown, best[i + 1][1], -(i + 1))
+        node = trie
+        j = i
+        while j < n:
+            node = node.get(letters[j])
+            if node is None:
+                break
+            j += 1
+            if '' in node and node[''] + best[j][0] > choice[0]:
+                choice = (node[''] + best[j][0], j - i + best[j][1], j)
+        best[i] = choice
+
+    # unknown letters are marked with a negative end
+    words = []
+    i = 0
+    while i < n:
+        end = best[i][2]
+        words.append(letters[i:abs(end)])
+        i = abs(end)
+    return words, best[0][1] / n, best[0][0] / n
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+#               dictFile (string)
+#               corpusFile (string)
+# Return:       ratio (float): number between 0 to 1
+# Description:  Segmentation score of a text on a 0 to 1 scale:
+#               0 --> split into rare one-letter words
+#               1 --> as likely as the words of the corpus (or better)
+#               English, with or without spaces, scores about 0.9 to 1,
+#               gibberish and wrong transpositions about 0.3 to 0.6
+#               Can be used as a scorer wherever a dictionary is expected
+#               (see utilities.is_plaintext)
+#               A text without letters --> 0
+# -----------------------------------------------------------
+
+
+def get_ratio(text, dictFile='engmix.txt', corpusFile='corpus.txt'):
+    trie, rare, englishScore = load_trie(dictFile, corpusFile)
+    words, coverage, score = segment(text, dictFile, corpusFile)
+    if words == []:
+        return 0
+    return min(1, max(0, (score - rare) / (englishScore - rare)))
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+#               threshold (float): number between 0 to 1
+#               dictFile (string)
+#               corpusFile (string)
+# Return:       True/False
+# Description:  Segmentation alternative to utilities.is_plaintext
+#               for decryptions without word boundaries
+#               If get_ratio(text) >= threshold --> True
+#               If invalid threshold given, default is 0.9
+# -----------------------------------------------------------
+
+
+def is_plaintext(text, threshold, dictFile='engmix.txt', corpusFile='corpus.txt'):
+    if threshold < 0 or threshold > 1:
+        threshold = 0.9
+    return get_ratio(text, dictFile, corpusFile) >= threshold
@@ -0,0 +1,462 @@
+import os
+import re
+import json
+import time
+import fitness
+import dictionary
+import keysearch
+import resultcache
+import utilities
+
+# 1- get_wordPattern(word)
+# 2- build_patternIndex(dictFile, indexFile, corpusFile)
+# 3- load_patternIndex(dictFile, corpusFile)
+# 4- e_substitution(plaintext, key)
+# 5- d_substitution(ciphertext, key)
+# 6- get_candidateMap(cipherWord, patternIndex)
+# 7- intersect_maps(map1, map2)
+# 8- cryptanalysis_substitution(ciphertext, dictFile, timeout, cancel, progress, scorer, threshold)
+
+# pattern indexes loaded so far, keyed by (dictFile, corpusFile, modification time)
+_cache = {}
+
+# steps of the word search in cryptanalysis_substitution
+_MAX_NODES = 1000000
+
+# -----------------------------------------------------------
+# Parameters:   word (string)
+# Return:       pattern (string)
+# Description:  Letter pattern of a word: each letter is replaced by the
+#               order of its first appearance, separated by dots
+#               e.g. 'hello' --> '0.1.2.2.3', 'puppy' --> '0.1.0.0.2'
+#               Case is ignored
+# -----------------------------------------------------------
+
+
+def get_wordPattern(word):
+    order = {}
+    pattern = []
+    for char in word.lower():
+        if char not in order:
+            order[char] = str(len(order))
+        pattern.append(order[char])
+    return '.'.join(pattern)
+
+# -----------------------------------------------------------
+# Parameters:   dictFile (string): word list, one word per line
+#               indexFile (string): output file
+#               corpusFile (string): English text used for word frequencies
+# Return:       patternIndex (dict): pattern --> list of words
+# Description:  Groups all dictionary words made of a-z by letter pattern
+#               and saves the result as JSON
+#               Words of each pattern are sorted from most to least
+#               frequent in the corpus, then alphabetically
+# -----------------------------------------------------------
+
+
+def build_patternIndex(dictFile, indexFile, corpusFile='corpus.txt'):
+    inFile = open(corpusFile, 'r', encoding='utf8')
+    counts = {}
+    for w in re.findall('[a-z]+', inFile.read().lower()):
+        counts[w] = counts.get(w, 0) + 1
+    inFile.close()
+
+    patternIndex = {}
+    for word in sorted(dictionary.load_dictionary(dictFile), key=lambda w: (-counts.get(w, 0), w)):
+        if re.fullmatch('[a-z]+', word) is not None:
+            patternIndex.setdefault(get_wordPattern(word), []).append(word)
+
+    tempFile = indexFile + '.tmp' + str(os.getpid())
+    outFile = open(tempFile, 'w')
+    json.dump(patternIndex, outFile)
+    outFile.close()
+    os.replace(tempFile, indexFile)
+    return patternIndex
+
+# -----------------------------------------------------------
+# Parameters:   dictFile (string): word list
+#               corpusFile (string): English text used for word frequencies
+# Return:       patternIndex (dict): pattern --> list of words
+# Description:  Loads the pattern index of a dictionary
+#               The index is saved next to the dictionary
+#               (engmix.txt --> engmix.patterns) and rebuilt when missing
+#               or older than the dictionary or the corpus.
+#               Each process loads it once.
+# -----------------------------------------------------------
+
+
+def load_patternIndex(dictFile='engmix.txt', corpusFile='corpus.txt'):
+    path = os.path.abspath(dictFile)
+    mtime = max(os.path.getmtime(path), os.path.getmtime(corpusFile))
+    key = (path, os.path.abspath(corpusFile), mtime)
+    if key in _cache:
+        return _cache[key]
+
+    indexFile = os.path.splitext(path)[0] + '.patterns'
+    if not os.path.exists(indexFile) or os.path.getmtime(indexFile) < mtime:
+        patternIndex = build_patternIndex(path, indexFile, corpusFile)
+    else:
+        inFile = open(indexFile, 'r')
+        patternIndex = json.load(inFile)
+        inFile.close()
+    _cache[key] = patternIndex
+    return patternIndex
+
+# -----------------------------------------------------------
+# Parameters:   plaintext (str)
+#               key (str): 26 letters, key[0] replaces 'a', key[1] 'b', ...
+# Return:       ciphertext (str)
+# Description:  Encryption using a general monoalphabetic substitution
+#               Non alpha characters --> no substitution
+#               Case of letters is preserved
+# Errors:       if key is not a permutation of the alphabet
+#                   print error msg and return empty string
+# -----------------------------------------------------------
+
+
+def e_substitution(plaintext, key):
+    alphabet = utilities.get_lower()
+    if not isinstance(key, str) or sorted(key.lower()) != list(alphabet):
+        print('Error (e_substitution): Invalid key')
+        return ''
+    key = key.lower()
+    return plaintext.translate(str.maketrans(alphabet + alphabet.upper(), key + key.upper()))
+
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               key (str): 26 letters, key[0] replaces 'a', key[1] 'b', ...
+#                   '_' for letters whose substitution is unknown
+# Return:       plaintext (str)
+# Description:  Decryption using a general monoalphabetic substitution
+#               Ciphertext letters not found in the key become '_'
+#               Non alpha characters --> no substitution
+#               Case of letters is preserved
+# -----------------------------------------------------------
+
+
+def d_substitution(ciphertext, key):
+    alphabet = utilities.get_lower()
+    key = key.lower()
+    table = {}
+    for char in alphabet:
+        plainChar = alphabet[key.index(char)] if char in key else '_'
+        table[ord(char)] = plainChar
+        table[ord(char.upper())] = plainChar.upper()
+    return ciphertext.translate(table)
+
+# -----------------------------------------------------------
+# Parameters:   cipherWord (str): lower case letters
+#               patternIndex (dict)
+# Return:       candidateMap (dict): cipher letter --> set of plain letters
+# Description:  Plain letters each letter of cipherWord can stand for,
+#               according to all dictionary words with the same pattern
+#               A word without candidates (e.g. a name) --> {}
+# -----------------------------------------------------------
+
+
+def get_candidateMap(cipherWord, patternIndex):
+    return _get_wordMap(cipherWord, patternIndex.get(get_wordPattern(cipherWord), []))
+
+# -----------------------------------------------------------
+# Parameters:   cipherWord (str): lower case letters
+#               words (list): plain words with the pattern of cipherWord
+# Return:       candidateMap (dict): see get_candidateMap
+# Description:  Words with the same pattern repeat a letter where
+#               cipherWord does, so the first position of each cipher
+#               letter gives all its plain letters
+# -----------------------------------------------------------
+
+
+def _get_wordMap(cipherWord, words):
+    candidateMap = {}
+    for c, letters in zip(cipherWord, zip(*words)):
+        if c not in candidateMap:
+            candidateMap[c] = set(letters)
+    return candidateMap
+
+# -----------------------------------------------------------
+# Parameters:   map1, map2 (dict): cipher letter --> set of plain letters
+# Return:       candidateMap (dict)
+# Description:  Intersection of two candidate maps
+#               A letter missing from one map is unconstrained by it
+# -----------------------------------------------------------
+
+
+def intersect_maps(map1, map2):
+    candidateMap = dict(map1)
+    for letter in map2:
+        if letter in candidateMap:
+            candidateMap[letter] = candidateMap[letter] & map2[letter]
+        else:
+            candidateMap[letter] = set(map2[letter])
+    return candidateMap
+
+# -----------------------------------------------------------
+# Parameters:   candidates (dict): cipher word --> list of plain words
+#               maps (dict): cipher word --> its candidate map
+# Return:       None
+# Description:  Removes noise words (e.g. names): words whose candidate
+#               maps leave some cipher letter with no plain letter when
+#               intersected with the others
+#               While a letter is left empty, the word whose removal
+#               leaves the fewest empty letters is removed (on a tie, the
+#               one with more candidates: a word matching few dictionary
+#               words is more likely one of them), whatever the order of
+#               the words
+# -----------------------------------------------------------
+
+
+def _drop_noise(candidates, maps):
+    while True:
+        # words[c]: maps with letter c, counts[c][p]: those allowing p for c
+        words = {}
+        counts = {}
+        for word in maps:
+            for c in maps[word]:
+                words[c] = words.get(c, 0) + 1
+                for p in maps[word][c]:
+                    counts.setdefault(c, {})
+                    counts[c][p] = counts[c].get(p, 0) + 1
+
+        def get_empty(skip):
+            empty = 0
+            for c in words:
+                skipMap = maps[skip] if skip is not None else {}
+                need = words[c] - (c in skipMap)
+                if need > 0 and all(counts.get(c, {}).get(p, 0) - (p in skipMap.get(c, ())) < need
+                                    for p in counts.get(c, {})):
+                    empty += 1
+            return empty
+
+        empty = get_empty(None)
+        if empty == 0:
+            return
+        noise = min(maps, key=lambda w: (get_empty(w), -len(candidates[w]), w))
+        if get_empty(noise) >= empty:
+            return
+        del maps[noise]
+        del candidates[noise]
+
+# -----------------------------------------------------------
+# Parameters:   candidateMap (dict)
+# Return:       candidateMap (dict)
+# Description:  A plain letter decided for one cipher letter is removed
+#               from all other cipher letters, repeated until nothing changes
+# -----------------------------------------------------------
+
+
+def _remove_solved(candidateMap):
+    changed = True
+    while changed:
+        changed = False
+        for letter in candidateMap:
+            if len(candidateMap[letter]) != 1:
+                continue
+            solved = next(iter(candidateMap[letter]))
+            for other in candidateMap:
+                if other != letter and solved in candidateMap[other]:
+                    candidateMap[other] = candidateMap[other] - {solved}
+                    changed = True
+    return candidateMap
+
+# -----------------------------------------------------------
+# Parameters:   candidates (dict): cipher word --> list of plain words
+#               interrupted: function, True once the search must stop
+# Return:       mapping (dict): cipher letter --> plain letter
+#               nodes (int): candidate words tried
+#               fraction (float): part of the search done
+#               stopped (bool): True if interrupted
+# Description:  Depth first search for the one-to-one letter mapping that
+#               turns the most cipher words into candidate words
+#               At every step the candidates of all words left are filtered
+#               by the mapping so far, and the word with the fewest is placed
+#               next; words left without candidates (e.g. names) are skipped
+#               A word whose letters are all mapped already has nothing left
+#               to choose: it is counted as matched if it fits, and dropped
+#               Branches that cannot beat the best mapping found are cut,
+#               and the search stops after _MAX_NODES candidate words
+#               If interrupted, the best mapping found so far is returned
+# -----------------------------------------------------------
+
+
+def _search_mapping(candidates, interrupted):
+    best = [-1, {}]
+    nodes = [0]
+    fraction = [0]
+    stopped = [False]
+
+    # plainWord has the pattern of cipherWord, so its new letters are
+    # consistent with each other
+    def fits(cipherWord, plainWord, mapping, used):
+        for c, p in zip(cipherWord, plainWord):
+            if c in mapping:
+                if mapping[c] != p:
+                    return False
+            elif p in used:
+                return False
+        return True
+
+    def search(left, mapping, used, matched):
+        if stopped[0] or interrupted():
+            stopped[0] = True
+            return
+        filtered = {}
+        for cipherWord in left:
+            nodes[0] += len(left[cipherWord])
+            words = [w for w in left[cipherWord] if fits(cipherWord, w, mapping, used)]
+            if words == []:
+                continue
+            if all(c in mapping for c in cipherWord):
+                matched += 1
+            else:
+                filtered[cipherWord] = words
+        if matched + len(filtered) <= best[0] or nodes[0] > _MAX_NODES:
+            return
+        if filtered == {}:
+            best[0] = matched
+            best[1] = dict(mapping)
+            return
+        cipherWord = min(filtered, key=lambda w: (len(filtered[w]), w))
+        words = filtered.pop(cipherWord)
+        for i in range(len(words)):
+            plainWord = words[i]
+            added = [c for c in set(cipherWord) if c not in mapping]
+            for c in added:
+                mapping[c] = plainWord[cipherWord.index(c)]
+                used.add(mapping[c])
+            search(filtered, mapping, used, matched + 1)
+            for c in added:
+                used.discard(mapping.pop(c))
+            if matched == 0:
+                fraction[0] = (i + 1) / (len(words) + 1)
+            if nodes[0] > _MAX_NODES or stopped[0]:
+                return
+        search(filtered, mapping, used, matched)
+
+    search(candidates, {}, set(), 0)
+    if not stopped[0]:
+        fraction[0] = 1
+    return best[1], nodes[0], fraction[0], stopped[0]
+
+# -----------------------------------------------------------
+# Parameters:   ciphertext (str)
+#               dictFile (string): word list
+#               timeout: seconds the search may take, None for no limit
+#               cancel: object with an is_set() method, e.g. threading.Event
+#               progress: function called with the number of candidate
+#                   words tried once step 4 ends (as in keysearch.KeySearch)
+#               scorer: dictionary or scorer function (see
+#                   utilities.is_plaintext) that checks the decryption,
+#                   default is fitness.get_ratio: the candidates are all
+#                   dictionary words, so a dictionary can not tell a wrong
+#                   key from the right one
+#               threshold (float): the key is found if its decryption is a
+#                   plaintext for scorer, default is 0.9
+#               cache: see resultcache.cached
+# Return:       plaintext, key (keysearch.SearchResult)
+#               key (str): 26 letters, key[0] replaces 'a', ... ('_' if unknown)
+# Description:  Cryptanalysis of a general monoalphabetic substitution
+#               by word patterns, without searching the 26! keys:
+#               1- every cipher word gets the candidate map of its pattern
+#               2- maps of all words are intersected, solved letters are
+#                  removed from the other letters; words that leave a
+#                  letter without candidates (e.g. names) are ignored
+#               3- candidate words inconsistent with the map are dropped,
+#                  and steps 1-2 repeat until the map stops shrinking
+#               4- a depth first search picks one remaining candidate per
+#                  word, keeping the letter mapping one-to-one and matching
+#                  as many words as possible
+#               Cipher words with no dictionary candidates are ignored
+#               Short texts may have several keys that give only
+#               dictionary words: the one using the most common words is kept
+#               If cryptanalysis fails, or the key found does not give a
+#               plaintext: returns '','' with status 'not found'
+#               timeout and cancel are checked during step 4; if it stops
+#               early, the best key so far is returned with status
+#               'timed out' or 'cancelled' (see keysearch.SearchResult)
+# -----------------------------------------------------------
+
+
+@resultcache.cached('substitution')
+def cryptanalysis_substitution(ciphertext, dictFile='engmix.txt', timeout=None, cancel=None,
+                               progress=None, scorer=None, threshold=0.9):
+    alphabet = utilities.get_lower()
+    if scorer is None:
+        scorer = fitness.get_ratio
+    deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def interrupted():
+        if deadline is not None and time.monotonic() >= deadline:
+            return True
+        return cancel is not None and cancel.is_set()
+
+    patternIndex = load_patternIndex(dictFile)
+    cipherWords = set(re.findall('[a-z]+', ciphertext.lower()))
+    candidates = {}
+    for word in cipherWords:
+        words = patternIndex.get(get_wordPattern(word), [])
+        if words != []:
+            candidates[word] = words
+    if candidates == {}:
+        return keysearch.SearchResult(('', ''), 'not found', 0, 1)
+
+    # the map of a word is only rebuilt when its candidates change, and
+    # words with the same pattern start with the same map
+    maps = {}
+    first = {}
+    for word in candidates:
+        pattern = get_wordPattern(word)
+        if pattern not in first:
+            first[pattern] = word
+            maps[word] = _get_wordMap(word, candidates[word])
+        else:
+            other = first[pattern]
+            maps[word] = {c: set(maps[other][o]) for o, c in zip(other, word)}
+    candidateMap = {}
+    while True:
+        _drop_noise(candidates, maps)
+        # starting from the previous map keeps every step shrinking it
+        newMap = candidateMap
+        for word in candidates:
+            newMap = intersect_maps(newMap, maps[word])
+        newMap = _remove_solved(newMap)
+        # drop candidate words that no longer fit the map
+        for word in list(candidates):
+            if all(maps[word][c] <= newMap[c] for c in maps[word]):
+                continue
+            fitting = []
+            if all(newMap[c] != set() for c in word):
+                fits = re.compile(''.join('[' + ''.join(newMap[c]) + ']' for c in word)).fullmatch
+                fitting = list(filter(fits, candidates[word]))
+            if fitting == []:
+                del candidates[word]
+                del maps[word]
+            elif len(fitting) < len(candidates[word]):
+                candidates[word] = fitting
+                maps[word] = _get_wordMap(word, fitting)
+        if newMap == candidateMap or candidates == {}:
+            break
+        candidateMap = newMap
+
+    # choose one candidate per word
+    mapping, nodes, fraction, stopped = _search_mapping(candidates, interrupted)
+    if progress is not None:
+        progress(nodes)
+    status = 'found'
+    if stopped:
+        status = 'cancelled' if cancel is not None and cancel.is_set() else 'timed out'
+    for c in candidateMap:
+        if c not in mapping and len(candidateMap[c]) == 1:
+            p = next(iter(candidateMap[c]))
+            if p not in mapping.values():
+                mapping[c] = p
+    if mapping == {}:
+        return keysearch.SearchResult(('', ''), 'not found' if not stopped else status, nodes, fraction)
+    key = ['_'] * 26
+    for c in mapping:
+        key[alphabet.index(mapping[c])] = c
+    key = ''.join(key)
+    plaintext = d_substitution(ciphertext, key)
+    if status == 'found' and not utilities.is_plaintext(plaintext, scorer, threshold):
+        return keysearch.SearchResult(('', ''), 'not found', nodes, fraction)
+    return keysearch.SearchResult((plaintext, key), status, nodes, fraction)
@@ -2,6 +2,7 @@
 import random
 import string
 import math
+import dictionary
 
 # 1- get_lower()
 # 2- get_baseString()
@@ -37,6 +38,8 @@ import math
 # 32- d_shift(ciphertext,key)
 # 33- cryptanalysis_shift(ciphertext)
 # 34- get_playfairSquare()
+# 35- is_plaintext_stream(words, total, dictList, threshold)
+# 36- score_candidates(texts, scorer, threshold, exact)
 
 # -----------------------------------------------------------
 # Parameters:   None
@@ -71,22 +74,14 @@ def get_baseString():
 
 # -----------------------------------------------------------
 # Parameters:   dictFile (string): filename
-# Return:       list of words (list)
+# Return:       dictionary (dictionary.Dictionary)
 # Description:  Reads a given dictionary file
 #               dictionary file is assumed to be formatted: each word in a separate line
-#               Returns a list of lists, list[0] contains all words starting with 'a'
-#               list[1] all words starting with 'b' and so forth.
+#               Returns a set-like object of all words, checked with "word in dictList"
+#               The file is only read once per process (see dictionary.py)
 # -----------------------------------------------------------
 def load_dictionary(dictFile):
-    alphabet = get_lower()
-    inFile = open(dictFile, 'r', encoding=" ISO-8859-15")
-    dictWords = inFile.readlines()
-    dictList = [[] for i in range(26)]
-    for w in dictWords:
-        word = w.strip('\n')
-        dictList[alphabet.index(word[0])] += [word]
-    inFile.close()
-    return dictList
+    return dictionary.load_dictionary(dictFile)
 
 # -------------------------------------------------------------------
 # Parameters:   text (string)
@@ -112,7 +107,7 @@ def text_to_words(text):
 
 # -----------------------------------------------------------
 # Parameters:   text (string)
-#               dictList (list of lists)
+#               dictList (Dictionary, list of lists or filename)
 # Return:       (#matches, #mismatches)
 # Description:  Reads a given text, checks if each word appears in dictionary
 #               Returns a tuple of number of matches and number of mismatches.
@@ -121,44 +116,49 @@ def text_to_words(text):
 
 
 def analyze_text(text, dictList):
+    dictList = dictionary.as_dictionary(dictList)
     wordList = text_to_words(text)
-    alphabet = get_lower()
     matches = 0
     mismatches = 0
     for w in wordList:
-        if w.isalpha():
-            listNum = alphabet.index(w[0].lower())
-            if w.lower() in dictList[listNum]:
-                matches += 1
-            else:
-                mismatches += 1
+        if w.isalpha() and w.lower() in dictList:
+            matches += 1
         else:
             mismatches += 1
     return(matches, mismatches)
 
 # -----------------------------------------------------------
 # Parameters:   text (string)
-#               dictList (list of lists)
+#               dictList (Dictionary, list of lists or filename)
+#                   or a scorer function: text --> ratio between 0 to 1
+#                   e.g. fitness.get_ratio
 #               threshold (float): number between 0 to 1
 # Return:       True/False
 # Description:  Check if a given file is a plaintext
 #               If #matches/#words >= threshold --> True
 #                   otherwise --> False
+#               If a scorer is given: scorer(text) >= threshold --> True
 #               If invalid threshold given, default is 0.9
 #               An empty string is assumed to be non-plaintext.
+#               Words are looked up lazily, stops as soon as the result is known
+#               (see is_plaintext_stream)
 # -----------------------------------------------------------
 
 
 def is_plaintext(text, dictList, threshold):
     if text == '':
         return False
-    result = analyze_text(text, dictList)
-    percentage = result[0]/(result[0]+result[1])
     if threshold < 0 or threshold > 1:
         threshold = 0.9
-    if percentage >= threshold:
-        return True
-    return False
+    if callable(dictList):
+        return dictList(text) >= threshold
+    # same words as text_to_words, but punctuation is stripped on demand
+    tokens = text.replace('\n', ' ').split(' ')
+    total = len(tokens) - tokens.count('')
+    words = (t.strip(string.punctuation) for t in tokens if t != '')
+    # non-alphabetic words never match
+    words = (w if w.isalpha() else '' for w in words)
+    return is_plaintext_stream(words, total, dictList, threshold)
 
 # -----------------------------------------------------------
 # Parameters:   r: #rows (int)
@@ -681,3 +681,135 @@ def get_playfairSquare():
               ['L', 'X', 'Y', 'Q', 'B'],
               ['M', 'N', 'O', 'P', 'A']]
     return square
+
+# -----------------------------------------------------------
+# Parameters:   words (iterable of strings): read lazily
+#               total (int): number of words in words
+#               dictList (Dictionary, list of lists or filename)
+#               threshold (float): number between 0 to 1
+# Return:       True/False
+# Description:  Decides if #matches/total >= threshold
+#               After each word, the final ratio is known to lie between
+#               matches/total (all remaining words mismatch) and
+#               (matches+remaining)/total (all remaining words match)
+#               Returns as soon as either bound settles the result,
+#               so the verdict is the same as checking every word
+#               A word matches if it is in the dictionary (compared in lowercase)
+#               If there are no words --> False
+# -----------------------------------------------------------
+
+
+def is_plaintext_stream(words, total, dictList, threshold):
+    if total == 0:
+        return False
+    dictList = dictionary.as_dictionary(dictList)
+    matches = 0
+    remaining = total
+    for w in words:
+        remaining -= 1
+        if w.lower() in dictList:
+            matches += 1
+            if matches/total >= threshold:
+                return True
+        elif (matches+remaining)/total < threshold:
+            return False
+    return matches/total >= threshold
+
+# -----------------------------------------------------------
+# Parameters:   text (string)
+#               size (int): words split at a time, default is 64
+# Return:       tokens of text.split(' '), as a generator
+# Description:  Splits text a few words at a time, so a caller that stops
+#               early does not split all of it
+# -----------------------------------------------------------
+
+
+def _split_lazily(text, size=64):
+    while True:
+        tokens = text.split(' ', size)
+        if len(tokens) <= size:
+            yield from tokens
+            return
+        text = tokens.pop()
+        yield from tokens
+
+# -----------------------------------------------------------
+# Parameters:   texts (list of strings): candidate decryptions
+#               scorer: dictionary (Dictionary, list of lists or filename)
+#                   or a scorer function: text --> ratio between 0 to 1
+#               threshold (float): number between 0 to 1
+#               exact (bool): False --> only index is needed, default is True
+# Return:       ratios (list of floats), index (int)
+# Description:  Scores a whole batch of candidates at once
+#               ratios[i] is #matches/#words of texts[i] (as in is_plaintext)
+#               or scorer(texts[i]) for a scorer function
+#               index is the first candidate with ratio >= threshold
+#                   or -1 if there is none
+#               Every distinct word of the batch is looked up only once
+#               If not exact, a text stops being looked up as soon as its
+#               result is known (as in is_plaintext_stream), and the texts
+#               after index are not scored: ratios[i] is then only a lower
+#               bound (0 after index), but is >= threshold exactly when the
+#               full ratio is
+#               A scorer function with a "many" attribute (texts --> ratios)
+#               is called once for the whole batch, e.g. fitness.get_ratio
+#               If invalid threshold given, default is 0.9
+#               An empty string, or a text without words, has ratio 0
+# -----------------------------------------------------------
+
+
+def score_candidates(texts, scorer, threshold, exact=True):
+    if threshold < 0 or threshold > 1:
+        threshold = 0.9
+    if hasattr(scorer, 'many'):
+        ratios = [float(r) for r in scorer.many(texts)]
+    elif callable(scorer):
+        ratios = []
+        for t in texts:
+            ratios.append(scorer(t) if t != '' else 0.0)
+            if not exact and ratios[-1] >= threshold:
+                break
+    else:
+        scorer = dictionary.as_dictionary(scorer)
+        # word --> True/False, local so threads can score at the same time
+        found = {}
+        ratios = []
+        for text in texts:
+            text = text.replace('\n', ' ')
+            if exact:
+                tokens = text.split(' ')
+                bound = len(tokens) - tokens.count('')
+            else:
+                # more than the words, so a result settled with it is also
+                # settled with the number of words, which is not known yet
+                tokens = _split_lazily(text)
+                bound = text.count(' ') + 1
+            total = 0
+            matches = 0
+            for t in tokens:
+                if t == '':
+                    continue
+                total += 1
+                match = found.get(t)
+                if match is None:
+                    w = t.strip(string.punctuation)
+                    match = w.isalpha() and w.lower() in scorer
+                    found[t] = match
+                if match:
+                    matches += 1
+                    if not exact and matches/bound >= threshold:
+                        break
+                elif not exact and (matches+bound-total)/bound < threshold:
+                    break
+            else:
+                # every word was looked up: bound is the number of words
+                bound = total
+            ratios.append(matches/bound if bound > 0 else 0.0)
+            if not exact and ratios[-1] >= threshold:
+                break
+    ratios += [0.0] * (len(texts) - len(ratios))
+
+    for i in range(len(ratios)):
+        if ratios[i] >= threshold:
+            return ratios, i
+    return ratios, -1